@@ -1,12 +1,60 @@
-import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
+from io import BytesIO
+from assets import page_icon, sidebar_branding
+from data_source import get_source
+
+# Função para filtrar por idade, memorizada por versão da base e faixa enviada
+# (guarda só os rótulos das linhas, não cópias da base)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def filter_bank(_bank_raw, version, idades):
+    return _bank_raw[(_bank_raw['age'] >= idades[0]) & (_bank_raw['age'] <= idades[1])].index.to_numpy()
+
+# Função para montar os gráficos e renderizá-los em PNG, memorizada por versão da base e filtros enviados
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_chart(_bank_raw, _bank, version, filters):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
+
+    # Gráfico dos dados brutos
+    bank_raw_target_perc = _bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_raw_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_raw_target_perc,
+        ax=ax[0],
+        order=['no', 'yes'],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[0].containers:
+        ax[0].bar_label(container)
+    ax[0].set_title('Dados brutos', fontweight="bold")
+
+    # Gráfico dos dados filtrados
+    bank_target_perc = _bank['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_target_perc,
+        ax=ax[1],
+        order=['no', 'yes'],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[1].containers:
+        ax[1].bar_label(container)
+    ax[1].set_title('Dados filtrados', fontweight="bold")
+
+    # Renderizar em PNG e liberar a figura do matplotlib
+    output = BytesIO()
+    fig.savefig(output, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return output.getvalue()
 
 def main():
     st.set_page_config(page_title='Telemarketing analisys', 
-                       page_icon='../img/telmarketing_icon.png',
+                       page_icon=page_icon(),
                        layout="wide",
                        initial_sidebar_state='expanded')
 
@@ -14,28 +62,31 @@ def main():
     st.markdown("---")
 
     # Exibir imagem na barra lateral
-    image = Image.open("../img/Bank-Branding.jpg")
-    st.sidebar.image(image)
+    sidebar_branding()
 
     # Ler dados
-    bank_raw = pd.read_csv('../data/input/bank-additional-full.csv', sep=';')
-    bank = bank_raw.copy()
+    source = get_source('../data/input/bank-additional-full.csv')
+    snapshot = source.snapshot()
+    version, bank_raw = snapshot.version, snapshot.data
 
     st.write('## Antes dos filtros')
     st.write(bank_raw.head())
 
-    # Slider para idade
-    max_age = int(bank.age.max())
-    min_age = int(bank.age.min())
-    idades = st.sidebar.slider(label='Idade', 
-                                min_value=min_age,
-                                max_value=max_age, 
-                                value=(min_age, max_age),
-                                step=1)
-    st.sidebar.write('Idades selecionadas:', idades)
+    # Slider para idade (só é aplicado ao enviar o formulário)
+    max_age = int(bank_raw.age.max())
+    min_age = int(bank_raw.age.min())
+    with st.sidebar.form(key='my_form'):
+        idades = st.slider(label='Idade', 
+                           min_value=min_age,
+                           max_value=max_age, 
+                           value=(min_age, max_age),
+                           step=1)
+        st.write('Idades selecionadas:', idades)
+        st.form_submit_button(label='Aplicar')
 
     # Aplicar filtro
-    bank = bank[(bank['age'] >= idades[0]) & (bank['age'] <= idades[1])]
+    rows = filter_bank(bank_raw, version, idades)
+    bank = bank_raw.loc[rows].reset_index(drop=True)
 
     if bank.empty:
         st.warning("Nenhum dado encontrado após os filtros.")
@@ -45,43 +96,10 @@ def main():
     st.write(bank.head())
     st.markdown("---")
 
-    # PLOTS    
-    plt.clf()
-    plt.close('all')
-    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-        # Gráfico dos dados brutos
-    bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
-    bank_raw_target_perc.columns = ['y', 'proportion']
-    sns.barplot(
-        x='y', 
-        y='proportion', 
-        data=bank_raw_target_perc, 
-        ax=ax[0], 
-        order=['no', 'yes'], 
-        palette={'no': 'blue', 'yes': 'orange'}
-    )
-    for container in ax[0].containers:
-        ax[0].bar_label(container)
-    ax[0].set_title('Dados brutos', fontweight="bold")
-
-    # Gráfico dos dados filtrados
-    bank_target_perc = bank['y'].value_counts(normalize=True).mul(100).reset_index()
-    bank_target_perc.columns = ['y', 'proportion']
-    sns.barplot(
-        x='y', 
-        y='proportion', 
-        data=bank_target_perc, 
-        ax=ax[1], 
-        order=['no', 'yes'], 
-        palette={'no': 'blue', 'yes': 'orange'}
-    )
-    for container in ax[1].containers:
-        ax[1].bar_label(container)
-    ax[1].set_title('Dados filtrados', fontweight="bold")
-
+    # Gráficos (renderizados uma vez por filtro enviado, guardados como PNG)
+    png = render_chart(bank_raw, bank, version, idades)
     st.write('## Proporção de aceite')
-    st.pyplot(fig)
+    st.image(png)
 
 if __name__ == '__main__':
     main()
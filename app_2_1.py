@@ -1,14 +1,61 @@
-import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
+from io import BytesIO
+from assets import page_icon, sidebar_branding
+from data_source import get_source
+
+# Função para aplicar os filtros, memorizada por versão da base e filtros enviados
+# (guarda só os rótulos das linhas, não cópias da base)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def filter_bank(_bank_raw, version, idades, jobs_selected):
+    bank = _bank_raw[(_bank_raw['age'] >= idades[0]) & (_bank_raw['age'] <= idades[1])]
+    return bank[bank['job'].isin(jobs_selected)].index.to_numpy()
+
+# Função para montar os gráficos e renderizá-los em PNG, memorizada por versão da base e filtros enviados
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_chart(_bank_raw, _bank, version, filters):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
+
+    # Dados brutos
+    bank_raw_target_perc = _bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_raw_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_raw_target_perc,
+        ax=ax[0],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[0].containers:
+        ax[0].bar_label(container)
+    ax[0].set_title('Dados Brutos', fontweight="bold")
+
+    # Dados filtrados
+    bank_target_perc = _bank['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_target_perc,
+        ax=ax[1],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[1].containers:
+        ax[1].bar_label(container)
+    ax[1].set_title('Dados Filtrados', fontweight="bold")
+
+    # Renderizar em PNG e liberar a figura do matplotlib
+    output = BytesIO()
+    fig.savefig(output, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return output.getvalue()
 
 def main():
     # Configuração inicial da página
     st.set_page_config(
         page_title='Telemarketing Analysis',
-        page_icon='../img/telmarketing_icon.png',
+        page_icon=page_icon(),
         layout="wide",
         initial_sidebar_state='expanded'
     )
@@ -17,16 +64,13 @@ def main():
     st.markdown("---")
 
     # Exibir imagem na barra lateral
-    try:
-        image = Image.open("../img/Bank-Branding.jpg")
-        st.sidebar.image(image)
-    except FileNotFoundError:
-        st.sidebar.warning("Imagem não encontrada!")
+    sidebar_branding()
 
     # Carregar dados
     try:
-        bank_raw = pd.read_csv('../data/input/bank-additional-full.csv', sep=';')
-        bank = bank_raw.copy()
+        source = get_source('../data/input/bank-additional-full.csv')
+        snapshot = source.snapshot()
+        version, bank_raw = snapshot.version, snapshot.data
     except FileNotFoundError:
         st.error("Arquivo de dados não encontrado!")
         return
@@ -34,30 +78,34 @@ def main():
     st.write('## Antes dos filtros')
     st.write(bank_raw.head())
 
-    # Filtro por idade
-    max_age = int(bank.age.max())
-    min_age = int(bank.age.min())
-    idades = st.sidebar.slider(
-        label='Idade',
-        min_value=min_age,
-        max_value=max_age,
-        value=(min_age, max_age),
-        step=1
-    )
-    st.sidebar.write('Idades selecionadas:', idades)
-
-    # Filtro por profissão
-    jobs_list = bank.job.unique().tolist()
-    jobs_selected = st.sidebar.multiselect(
-        "Profissões",
-        options=jobs_list,
-        default=jobs_list
-    )
-    st.sidebar.write('Profissões selecionadas:', jobs_selected)
+    # Filtros na barra lateral (só são aplicados ao enviar o formulário)
+    with st.sidebar.form(key='my_form'):
+        # Filtro por idade
+        max_age = int(bank_raw.age.max())
+        min_age = int(bank_raw.age.min())
+        idades = st.slider(
+            label='Idade',
+            min_value=min_age,
+            max_value=max_age,
+            value=(min_age, max_age),
+            step=1
+        )
+        st.write('Idades selecionadas:', idades)
+
+        # Filtro por profissão
+        jobs_list = bank_raw.job.unique().tolist()
+        jobs_selected = st.multiselect(
+            "Profissões",
+            options=jobs_list,
+            default=jobs_list
+        )
+        st.write('Profissões selecionadas:', jobs_selected)
+
+        st.form_submit_button(label='Aplicar')
 
     # Aplicar filtros ao dataframe
-    bank = bank[(bank['age'] >= idades[0]) & (bank['age'] <= idades[1])]
-    bank = bank[bank['job'].isin(jobs_selected)].reset_index(drop=True)
+    rows = filter_bank(bank_raw, version, idades, jobs_selected)
+    bank = bank_raw.loc[rows].reset_index(drop=True)
 
     st.write('## Após os filtros')
     if bank.empty:
@@ -66,40 +114,11 @@ def main():
     st.write(bank.head())
     st.markdown("---")
 
-    # Criação dos gráficos
-    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-    # Dados brutos
-    bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
-    bank_raw_target_perc.columns = ['y', 'proportion']
-    sns.barplot(
-        x='y',
-        y='proportion',
-        data=bank_raw_target_perc,
-        ax=ax[0],
-        palette={'no': 'blue', 'yes': 'orange'}
-    )
-    for container in ax[0].containers:
-        ax[0].bar_label(container)
-    ax[0].set_title('Dados Brutos', fontweight="bold")
-
-    # Dados filtrados
-    bank_target_perc = bank['y'].value_counts(normalize=True).mul(100).reset_index()
-    bank_target_perc.columns = ['y', 'proportion']
-    sns.barplot(
-        x='y',
-        y='proportion',
-        data=bank_target_perc,
-        ax=ax[1],
-        palette={'no': 'blue', 'yes': 'orange'}
-    )
-    for container in ax[1].containers:
-        ax[1].bar_label(container)
-    ax[1].set_title('Dados Filtrados', fontweight="bold")
-
+    # Gráficos (renderizados uma vez por filtro enviado, guardados como PNG)
+    png = render_chart(bank_raw, bank, version, (idades, jobs_selected))
     # Exibir os gráficos
     st.write('## Proporção de Aceite')
-    st.pyplot(fig)
+    st.image(png)
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,9 @@
-import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
+from io import BytesIO
+from assets import page_icon, sidebar_branding
+from data_source import get_source
 
 # Configuração personalizada para os gráficos
 custom_params = {"axes.spines.right": False, "axes.spines.top": False}
@@ -15,14 +16,63 @@ def multiselect_filter(relatorio, col, selecionados):
     if 'all' in selecionados:
         return relatorio
     else:
-        return relatorio[relatorio[col].isin(selecionados)].reset_index(drop=True)
+        return relatorio[relatorio[col].isin(selecionados)]
+
+# Função para aplicar os filtros, memorizada por versão da base e filtros enviados
+# (guarda só os rótulos das linhas, não cópias da base)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def filter_bank(_bank_raw, version, idades, jobs_selected):
+    bank = _bank_raw[(_bank_raw['age'] >= idades[0]) & (_bank_raw['age'] <= idades[1])]
+    return multiselect_filter(bank, 'job', list(jobs_selected)).index.to_numpy()
+
+# Função para montar os gráficos e renderizá-los em PNG, memorizada por versão da base e filtros enviados
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_chart(_bank_raw, _bank, version, filters):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
+
+    # Gráfico dos dados brutos
+    bank_raw_target_perc = _bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_raw_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_raw_target_perc,
+        ax=ax[0],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[0].containers:
+        ax[0].bar_label(container)
+    ax[0].set_title('Dados Brutos', fontweight="bold")
+
+    # Gráfico dos dados filtrados
+    try:
+        bank_target_perc = _bank['y'].value_counts(normalize=True).mul(100).reset_index()
+        bank_target_perc.columns = ['y', 'proportion']
+        sns.barplot(
+            x='y',
+            y='proportion',
+            data=bank_target_perc,
+            ax=ax[1],
+            palette={'no': 'blue', 'yes': 'orange'}
+        )
+        for container in ax[1].containers:
+            ax[1].bar_label(container)
+        ax[1].set_title('Dados Filtrados', fontweight="bold")
+    except KeyError:
+        st.error("Erro ao gerar o gráfico filtrado. Verifique os dados aplicados.")
+
+    # Renderizar em PNG e liberar a figura do matplotlib
+    output = BytesIO()
+    fig.savefig(output, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return output.getvalue()
 
 # Função principal da aplicação
 def main():
     # Configuração inicial da página
     st.set_page_config(
         page_title='Telemarketing Analysis',
-        page_icon='../img/telmarketing_icon.png',
+        page_icon=page_icon(),
         layout="wide",
         initial_sidebar_state='expanded'
     )
@@ -30,16 +80,13 @@ def main():
     st.markdown("---")
 
     # Carregar imagem para a barra lateral
-    try:
-        image = Image.open("../img/Bank-Branding.jpg")
-        st.sidebar.image(image)
-    except FileNotFoundError:
-        st.sidebar.warning("Imagem não encontrada!")
+    sidebar_branding()
 
     # Carregar dados
     try:
-        bank_raw = pd.read_csv('../data/input/bank-additional-full.csv', sep=';')
-        bank = bank_raw.copy()
+        source = get_source('../data/input/bank-additional-full.csv')
+        snapshot = source.snapshot()
+        version, bank_raw = snapshot.version, snapshot.data
     except FileNotFoundError:
         st.error("Arquivo de dados não encontrado!")
         return
@@ -50,8 +97,8 @@ def main():
     # Filtros na barra lateral
     with st.sidebar.form(key='my_form'):
         # Filtro de idade
-        max_age = int(bank.age.max())
-        min_age = int(bank.age.min())
+        max_age = int(bank_raw.age.max())
+        min_age = int(bank_raw.age.min())
         idades = st.slider(
             label='Idade',
             min_value=min_age,
@@ -62,7 +109,7 @@ def main():
         st.write('Idades selecionadas:', idades)
 
         # Filtro de profissões
-        jobs_list = bank.job.unique().tolist()
+        jobs_list = bank_raw.job.unique().tolist()
         jobs_list.append('all')
         jobs_selected = st.multiselect(
             "Profissões",
@@ -71,12 +118,12 @@ def main():
         )
         st.write('Profissões selecionadas:', jobs_selected)
 
-        # Aplicação dos filtros
-        bank = bank[(bank['age'] >= idades[0]) & (bank['age'] <= idades[1])]
-        bank = multiselect_filter(bank, 'job', jobs_selected)
-
         submit_button = st.form_submit_button(label='Aplicar')
 
+    # Aplicação dos filtros (fora do formulário: só recalcula quando o envio muda a seleção)
+    rows = filter_bank(bank_raw, version, idades, jobs_selected)
+    bank = bank_raw.loc[rows].reset_index(drop=True)
+
     # Verificar se o dataframe filtrado está vazio
     st.write('## Após os filtros')
     if bank.empty:
@@ -85,43 +132,11 @@ def main():
     st.write(bank.head())
     st.markdown("---")
 
-    # Criar gráficos
-    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-    # Gráfico dos dados brutos
-    bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
-    bank_raw_target_perc.columns = ['y', 'proportion']
-    sns.barplot(
-        x='y',
-        y='proportion',
-        data=bank_raw_target_perc,
-        ax=ax[0],
-        palette={'no': 'blue', 'yes': 'orange'}
-    )
-    for container in ax[0].containers:
-        ax[0].bar_label(container)
-    ax[0].set_title('Dados Brutos', fontweight="bold")
-
-    # Gráfico dos dados filtrados
-    try:
-        bank_target_perc = bank['y'].value_counts(normalize=True).mul(100).reset_index()
-        bank_target_perc.columns = ['y', 'proportion']
-        sns.barplot(
-            x='y',
-            y='proportion',
-            data=bank_target_perc,
-            ax=ax[1],
-            palette={'no': 'blue', 'yes': 'orange'}
-        )
-        for container in ax[1].containers:
-            ax[1].bar_label(container)
-        ax[1].set_title('Dados Filtrados', fontweight="bold")
-    except KeyError:
-        st.error("Erro ao gerar o gráfico filtrado. Verifique os dados aplicados.")
-
+    # Gráficos (renderizados uma vez por filtro enviado, guardados como PNG)
+    png = render_chart(bank_raw, bank, version, (idades, jobs_selected))
     # Exibir os gráficos
     st.write('## Proporção de Aceite')
-    st.pyplot(fig)
+    st.image(png)
 
 if __name__ == '__main__':
     main()
@@ -1,8 +1,9 @@
-import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
+from io import BytesIO
+from assets import page_icon, sidebar_branding
+from data_source import get_source
 
 # Configuração personalizada para os gráficos
 custom_params = {"axes.spines.right": False, "axes.spines.top": False}
@@ -15,14 +16,72 @@ def multiselect_filter(relatorio, col, selecionados):
     if 'all' in selecionados:
         return relatorio
     else:
-        return relatorio[relatorio[col].isin(selecionados)].reset_index(drop=True)
+        return relatorio[relatorio[col].isin(selecionados)]
+
+# Função para aplicar os filtros, memorizada por versão da base e filtros enviados
+# (guarda só os rótulos das linhas, não cópias da base)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def filter_bank(_bank_raw, version, idades, jobs_selected, marital_selected, default_selected,
+                housing_selected, loan_selected, contact_selected, month_selected, day_of_week_selected):
+    return (_bank_raw.query("age >= @idades[0] and age <= @idades[1]")
+                     .pipe(multiselect_filter, 'job', list(jobs_selected))
+                     .pipe(multiselect_filter, 'marital', list(marital_selected))
+                     .pipe(multiselect_filter, 'default', list(default_selected))
+                     .pipe(multiselect_filter, 'housing', list(housing_selected))
+                     .pipe(multiselect_filter, 'loan', list(loan_selected))
+                     .pipe(multiselect_filter, 'contact', list(contact_selected))
+                     .pipe(multiselect_filter, 'month', list(month_selected))
+                     .pipe(multiselect_filter, 'day_of_week', list(day_of_week_selected))
+    ).index.to_numpy()
+
+# Função para montar os gráficos e renderizá-los em PNG, memorizada por versão da base e filtros enviados
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_chart(_bank_raw, _bank, version, filters):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
+
+    # Gráfico dos dados brutos
+    bank_raw_target_perc = _bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_raw_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_raw_target_perc,
+        ax=ax[0],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[0].containers:
+        ax[0].bar_label(container)
+    ax[0].set_title('Dados Brutos', fontweight="bold")
+
+    # Gráfico dos dados filtrados
+    try:
+        bank_target_perc = _bank['y'].value_counts(normalize=True).mul(100).reset_index()
+        bank_target_perc.columns = ['y', 'proportion']
+        sns.barplot(
+            x='y',
+            y='proportion',
+            data=bank_target_perc,
+            ax=ax[1],
+            palette={'no': 'blue', 'yes': 'orange'}
+        )
+        for container in ax[1].containers:
+            ax[1].bar_label(container)
+        ax[1].set_title('Dados Filtrados', fontweight="bold")
+    except KeyError:
+        st.error("Erro ao gerar o gráfico filtrado. Verifique os dados aplicados.")
+
+    # Renderizar em PNG e liberar a figura do matplotlib
+    output = BytesIO()
+    fig.savefig(output, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return output.getvalue()
 
 # Função principal da aplicação
 def main():
     # Configuração inicial da página
     st.set_page_config(
         page_title='Telemarketing Analysis',
-        page_icon='../img/telmarketing_icon.png',
+        page_icon=page_icon(),
         layout="wide",
         initial_sidebar_state='expanded'
     )
@@ -30,16 +89,13 @@ def main():
     st.markdown("---")
 
     # Carregar imagem para a barra lateral
-    try:
-        image = Image.open("../img/Bank-Branding.jpg")
-        st.sidebar.image(image)
-    except FileNotFoundError:
-        st.sidebar.warning("Imagem não encontrada!")
+    sidebar_branding()
 
     # Carregar dados
     try:
-        bank_raw = pd.read_csv('../data/input/bank-additional-full.csv', sep=';')
-        bank = bank_raw.copy()
+        source = get_source('../data/input/bank-additional-full.csv')
+        snapshot = source.snapshot()
+        version, bank_raw = snapshot.version, snapshot.data
     except FileNotFoundError:
         st.error("Arquivo de dados não encontrado!")
         return
@@ -50,8 +106,8 @@ def main():
     # Filtros na barra lateral
     with st.sidebar.form(key='my_form'):
         # Filtro de idade
-        max_age = int(bank.age.max())
-        min_age = int(bank.age.min())
+        max_age = int(bank_raw.age.max())
+        min_age = int(bank_raw.age.min())
         idades = st.slider(
             label='Idade',
             min_value=min_age,
@@ -61,7 +117,7 @@ def main():
         )
 
         # Filtro de profissões
-        jobs_list = bank.job.unique().tolist()
+        jobs_list = bank_raw.job.unique().tolist()
         jobs_list.append('all')
         jobs_selected = st.multiselect(
             "Profissões",
@@ -70,7 +126,7 @@ def main():
         )
 
         # Filtro de estado civil
-        marital_list = bank.marital.unique().tolist()
+        marital_list = bank_raw.marital.unique().tolist()
         marital_list.append('all')
         marital_selected = st.multiselect(
             "Estado Civil",
@@ -79,7 +135,7 @@ def main():
         )
 
         # Filtro de default
-        default_list = bank.default.unique().tolist()
+        default_list = bank_raw.default.unique().tolist()
         default_list.append('all')
         default_selected = st.multiselect(
             "Default",
@@ -88,7 +144,7 @@ def main():
         )
 
         # Filtro de financiamento imobiliário
-        housing_list = bank.housing.unique().tolist()
+        housing_list = bank_raw.housing.unique().tolist()
         housing_list.append('all')
         housing_selected = st.multiselect(
             "Tem financiamento imobiliário?",
@@ -97,7 +153,7 @@ def main():
         )
 
         # Filtro de empréstimos
-        loan_list = bank.loan.unique().tolist()
+        loan_list = bank_raw.loan.unique().tolist()
         loan_list.append('all')
         loan_selected = st.multiselect(
             "Tem empréstimo?",
@@ -106,7 +162,7 @@ def main():
         )
 
         # Filtro de meio de contato
-        contact_list = bank.contact.unique().tolist()
+        contact_list = bank_raw.contact.unique().tolist()
         contact_list.append('all')
         contact_selected = st.multiselect(
             "Meio de contato",
@@ -115,7 +171,7 @@ def main():
         )
 
         # Filtro de mês de contato
-        month_list = bank.month.unique().tolist()
+        month_list = bank_raw.month.unique().tolist()
         month_list.append('all')
         month_selected = st.multiselect(
             "Mês do contato",
@@ -124,7 +180,7 @@ def main():
         )
 
         # Filtro de dia da semana
-        day_of_week_list = bank.day_of_week.unique().tolist()
+        day_of_week_list = bank_raw.day_of_week.unique().tolist()
         day_of_week_list.append('all')
         day_of_week_selected = st.multiselect(
             "Dia da semana",
@@ -132,20 +188,13 @@ def main():
             default=['all']
         )
 
-        # Aplicar filtros
-        bank = (bank.query("age >= @idades[0] and age <= @idades[1]")
-                    .pipe(multiselect_filter, 'job', jobs_selected)
-                    .pipe(multiselect_filter, 'marital', marital_selected)
-                    .pipe(multiselect_filter, 'default', default_selected)
-                    .pipe(multiselect_filter, 'housing', housing_selected)
-                    .pipe(multiselect_filter, 'loan', loan_selected)
-                    .pipe(multiselect_filter, 'contact', contact_selected)
-                    .pipe(multiselect_filter, 'month', month_selected)
-                    .pipe(multiselect_filter, 'day_of_week', day_of_week_selected)
-        )
-
         submit_button = st.form_submit_button(label='Aplicar')
 
+    # Aplicar filtros (fora do formulário: só recalcula quando o envio muda a seleção)
+    rows = filter_bank(bank_raw, version, idades, jobs_selected, marital_selected, default_selected,
+                       housing_selected, loan_selected, contact_selected, month_selected, day_of_week_selected)
+    bank = bank_raw.loc[rows].reset_index(drop=True)
+
     # Verificar se o dataframe filtrado está vazio
     st.write('## Após os filtros')
     if bank.empty:
@@ -154,43 +203,13 @@ def main():
     st.write(bank.head())
     st.markdown("---")
 
-    # Criar gráficos
-    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-    # Gráfico dos dados brutos
-    bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
-    bank_raw_target_perc.columns = ['y', 'proportion']
-    sns.barplot(
-        x='y',
-        y='proportion',
-        data=bank_raw_target_perc,
-        ax=ax[0],
-        palette={'no': 'blue', 'yes': 'orange'}
-    )
-    for container in ax[0].containers:
-        ax[0].bar_label(container)
-    ax[0].set_title('Dados Brutos', fontweight="bold")
-
-    # Gráfico dos dados filtrados
-    try:
-        bank_target_perc = bank['y'].value_counts(normalize=True).mul(100).reset_index()
-        bank_target_perc.columns = ['y', 'proportion']
-        sns.barplot(
-            x='y',
-            y='proportion',
-            data=bank_target_perc,
-            ax=ax[1],
-            palette={'no': 'blue', 'yes': 'orange'}
-        )
-        for container in ax[1].containers:
-            ax[1].bar_label(container)
-        ax[1].set_title('Dados Filtrados', fontweight="bold")
-    except KeyError:
-        st.error("Erro ao gerar o gráfico filtrado. Verifique os dados aplicados.")
-
+    # Gráficos (renderizados uma vez por filtro enviado, guardados como PNG)
+    png = render_chart(bank_raw, bank, version,
+                       (idades, jobs_selected, marital_selected, default_selected, housing_selected,
+                        loan_selected, contact_selected, month_selected, day_of_week_selected))
     # Exibir os gráficos
     st.write('## Proporção de Aceite')
-    st.pyplot(fig)
+    st.image(png)
 
 if __name__ == '__main__':
     main()
@@ -1,19 +1,22 @@
 import timeit
-import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
+from io import BytesIO
+from assets import page_icon, sidebar_branding
+from multi_upload import SOURCE_COLUMN, load_uploads
 
 # Configuração personalizada para gráficos
 custom_params = {"axes.spines.right": False, "axes.spines.top": False}
 sns.set_theme(style="ticks", rc=custom_params)
 
-# Função para carregar dados com cache
-@st.cache_data(show_spinner=True)
-def load_data(file_data):
+# Colunas de texto convertidas em categorias com dicionário único entre os arquivos
+CATEGORICAL_COLUMNS = ('job', 'marital', 'default', 'housing', 'loan', 'contact', 'month', 'day_of_week')
+
+# Função para carregar um ou mais arquivos (lidos em paralelo, com cache)
+def load_data(files):
     try:
-        return pd.read_csv(file_data, sep=';')
+        return load_uploads(files, categorical=CATEGORICAL_COLUMNS)
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo: {e}")
         return None
@@ -25,14 +28,74 @@ def multiselect_filter(relatorio, col, selecionados):
     if 'all' in selecionados:
         return relatorio
     else:
-        return relatorio[relatorio[col].isin(selecionados)].reset_index(drop=True)
+        return relatorio[relatorio[col].isin(selecionados)]
+
+# Função para aplicar os filtros, memorizada por arquivo e filtros enviados
+# (guarda só os rótulos das linhas, não cópias da base)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def filter_bank(_bank_raw, file_ids, idades, jobs_selected, marital_selected, default_selected,
+                housing_selected, loan_selected, contact_selected, month_selected, day_of_week_selected,
+                arquivo_selected):
+    return (_bank_raw.query("age >= @idades[0] and age <= @idades[1]")
+                     .pipe(multiselect_filter, 'job', list(jobs_selected))
+                     .pipe(multiselect_filter, 'marital', list(marital_selected))
+                     .pipe(multiselect_filter, 'default', list(default_selected))
+                     .pipe(multiselect_filter, 'housing', list(housing_selected))
+                     .pipe(multiselect_filter, 'loan', list(loan_selected))
+                     .pipe(multiselect_filter, 'contact', list(contact_selected))
+                     .pipe(multiselect_filter, 'month', list(month_selected))
+                     .pipe(multiselect_filter, 'day_of_week', list(day_of_week_selected))
+                     .pipe(multiselect_filter, SOURCE_COLUMN, list(arquivo_selected))
+    ).index.to_numpy()
+
+# Função para montar os gráficos e renderizá-los em PNG, memorizada por arquivos e filtros enviados
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_chart(_bank_raw, _bank, file_ids, filters):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
+
+    # Gráfico dos dados brutos
+    bank_raw_target_perc = _bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
+    bank_raw_target_perc.columns = ['y', 'proportion']
+    sns.barplot(
+        x='y',
+        y='proportion',
+        data=bank_raw_target_perc,
+        ax=ax[0],
+        palette={'no': 'blue', 'yes': 'orange'}
+    )
+    for container in ax[0].containers:
+        ax[0].bar_label(container)
+    ax[0].set_title('Dados Brutos', fontweight="bold")
+
+    # Gráfico dos dados filtrados
+    try:
+        bank_target_perc = _bank['y'].value_counts(normalize=True).mul(100).reset_index()
+        bank_target_perc.columns = ['y', 'proportion']
+        sns.barplot(
+            x='y',
+            y='proportion',
+            data=bank_target_perc,
+            ax=ax[1],
+            palette={'no': 'blue', 'yes': 'orange'}
+        )
+        for container in ax[1].containers:
+            ax[1].bar_label(container)
+        ax[1].set_title('Dados Filtrados', fontweight="bold")
+    except KeyError:
+        st.error("Erro ao gerar o gráfico filtrado. Verifique os dados aplicados.")
+
+    # Renderizar em PNG e liberar a figura do matplotlib
+    output = BytesIO()
+    fig.savefig(output, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return output.getvalue()
 
 # Função principal
 def main():
     # Configuração da página
     st.set_page_config(
         page_title='Telemarketing Analysis',
-        page_icon='../img/telmarketing_icon.png',
+        page_icon=page_icon(),
         layout="wide",
         initial_sidebar_state='expanded'
     )
@@ -41,27 +104,22 @@ def main():
     st.markdown("---")
 
     # Exibir imagem na barra lateral
-    try:
-        image = Image.open("../img/Bank-Branding.jpg")
-        st.sidebar.image(image)
-    except FileNotFoundError:
-        st.sidebar.warning("Imagem não encontrada!")
+    sidebar_branding()
 
-    # Upload de arquivo
-    st.sidebar.write("## Suba o arquivo")
-    data_file_1 = st.sidebar.file_uploader("Bank marketing data", type=['csv', 'xlsx'])
+    # Upload de arquivos (um ou vários, por exemplo um por região ou mês)
+    st.sidebar.write("## Suba os arquivos")
+    data_files = st.sidebar.file_uploader("Bank marketing data", type=['csv', 'xlsx'], accept_multiple_files=True)
 
-    if data_file_1 is not None:
-        # Medir tempo de carregamento do arquivo
+    if data_files:
+        # Medir tempo de carregamento dos arquivos
         start = timeit.default_timer()
-        bank_raw = load_data(data_file_1)
+        bank_raw = load_data(data_files)
         load_time = timeit.default_timer() - start
 
         if bank_raw is None:
             return  # Termina se os dados não forem carregados
 
         st.write(f"Tempo de carregamento: {load_time:.2f} segundos")
-        bank = bank_raw.copy()
 
         st.write('## Dados Antes dos Filtros')
         st.write(bank_raw.head())
@@ -69,8 +127,8 @@ def main():
         # Filtros na barra lateral
         with st.sidebar.form(key='my_form'):
             # Filtro de idade
-            max_age = int(bank.age.max())
-            min_age = int(bank.age.min())
+            max_age = int(bank_raw.age.max())
+            min_age = int(bank_raw.age.min())
             idades = st.slider(
                 label='Idade',
                 min_value=min_age,
@@ -80,59 +138,58 @@ def main():
             )
 
             # Filtro de profissões
-            jobs_list = bank.job.unique().tolist()
+            jobs_list = bank_raw.job.unique().tolist()
             jobs_list.append('all')
             jobs_selected = st.multiselect("Profissão", jobs_list, ['all'])
 
             # Filtro de estado civil
-            marital_list = bank.marital.unique().tolist()
+            marital_list = bank_raw.marital.unique().tolist()
             marital_list.append('all')
             marital_selected = st.multiselect("Estado civil", marital_list, ['all'])
 
             # Filtro de default
-            default_list = bank.default.unique().tolist()
+            default_list = bank_raw.default.unique().tolist()
             default_list.append('all')
             default_selected = st.multiselect("Default", default_list, ['all'])
 
             # Filtro de financiamento imobiliário
-            housing_list = bank.housing.unique().tolist()
+            housing_list = bank_raw.housing.unique().tolist()
             housing_list.append('all')
             housing_selected = st.multiselect("Tem financiamento imobiliário?", housing_list, ['all'])
 
             # Filtro de empréstimos
-            loan_list = bank.loan.unique().tolist()
+            loan_list = bank_raw.loan.unique().tolist()
             loan_list.append('all')
             loan_selected = st.multiselect("Tem empréstimo?", loan_list, ['all'])
 
             # Filtro de meio de contato
-            contact_list = bank.contact.unique().tolist()
+            contact_list = bank_raw.contact.unique().tolist()
             contact_list.append('all')
             contact_selected = st.multiselect("Meio de contato", contact_list, ['all'])
 
             # Filtro de mês de contato
-            month_list = bank.month.unique().tolist()
+            month_list = bank_raw.month.unique().tolist()
             month_list.append('all')
             month_selected = st.multiselect("Mês do contato", month_list, ['all'])
 
             # Filtro de dia da semana
-            day_of_week_list = bank.day_of_week.unique().tolist()
+            day_of_week_list = bank_raw.day_of_week.unique().tolist()
             day_of_week_list.append('all')
             day_of_week_selected = st.multiselect("Dia da semana", day_of_week_list, ['all'])
 
-            # Aplicar filtros
-            bank = (bank.query("age >= @idades[0] and age <= @idades[1]")
-                        .pipe(multiselect_filter, 'job', jobs_selected)
-                        .pipe(multiselect_filter, 'marital', marital_selected)
-                        .pipe(multiselect_filter, 'default', default_selected)
-                        .pipe(multiselect_filter, 'housing', housing_selected)
-                        .pipe(multiselect_filter, 'loan', loan_selected)
-                        .pipe(multiselect_filter, 'contact', contact_selected)
-                        .pipe(multiselect_filter, 'month', month_selected)
-                        .pipe(multiselect_filter, 'day_of_week', day_of_week_selected)
-                    )
+            # Filtro de arquivo de origem
+            arquivo_list = bank_raw[SOURCE_COLUMN].unique().tolist()
+            arquivo_list.append('all')
+            arquivo_selected = st.multiselect("Arquivo de origem", arquivo_list, ['all'])
 
             submit_button = st.form_submit_button(label='Aplicar')
 
+        # Aplicar filtros (fora do formulário: só recalcula quando o envio muda a seleção)
+        rows = filter_bank(bank_raw, tuple(f.file_id for f in data_files), idades, jobs_selected, marital_selected,
+                           default_selected, housing_selected, loan_selected, contact_selected, month_selected,
+                           day_of_week_selected, arquivo_selected)
+        bank = bank_raw.loc[rows].reset_index(drop=True)
+
         st.write('## Dados Após os Filtros')
         if bank.empty:
             st.warning("Nenhum dado encontrado após aplicar os filtros.")
@@ -140,41 +197,11 @@ def main():
         st.write(bank.head())
         st.markdown("---")
 
-        # Gráficos
-        fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-        # Gráfico dos dados brutos
-        bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
-        bank_raw_target_perc.columns = ['y', 'proportion']
-        sns.barplot(
-            x='y',
-            y='proportion',
-            data=bank_raw_target_perc,
-            ax=ax[0],
-            palette={'no': 'blue', 'yes': 'orange'}
-        )
-        for container in ax[0].containers:
-            ax[0].bar_label(container)
-        ax[0].set_title('Dados Brutos', fontweight="bold")
-
-        # Gráfico dos dados filtrados
-        try:
-            bank_target_perc = bank['y'].value_counts(normalize=True).mul(100).reset_index()
-            bank_target_perc.columns = ['y', 'proportion']
-            sns.barplot(
-                x='y',
-                y='proportion',
-                data=bank_target_perc,
-                ax=ax[1],
-                palette={'no': 'blue', 'yes': 'orange'}
-            )
-            for container in ax[1].containers:
-                ax[1].bar_label(container)
-            ax[1].set_title('Dados Filtrados', fontweight="bold")
-        except KeyError:
-            st.error("Erro ao gerar o gráfico filtrado. Verifique os dados aplicados.")
-
-        st.pyplot(fig)
+        # Gráficos (renderizados uma vez por filtro enviado, guardados como PNG)
+        png = render_chart(bank_raw, bank, tuple(f.file_id for f in data_files),
+                           (idades, jobs_selected, marital_selected, default_selected, housing_selected,
+                            loan_selected, contact_selected, month_selected, day_of_week_selected, arquivo_selected))
+        st.image(png)
 
 if __name__ == '__main__':
     main()
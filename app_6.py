@@ -3,14 +3,14 @@ import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
+from assets import page_icon, sidebar_branding
 from io import BytesIO
+from data_source import get_source
 
-# Função para ler os dados com cache
-@st.cache_data(show_spinner=True)
+# Função para ler os dados da fonte do servidor (recarregada quando o arquivo muda)
 def load_data(file_data):
     try:
-        return pd.read_csv(file_data, sep=';')
+        return get_source(file_data).get()
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo: {e}")
         return None
@@ -42,7 +42,7 @@ def main():
     # Configuração inicial da página
     st.set_page_config(
         page_title='Telemarketing Analysis',
-        page_icon='../img/telmarketing_icon.png',
+        page_icon=page_icon(),
         layout="wide",
         initial_sidebar_state='expanded'
     )
@@ -51,11 +51,7 @@ def main():
     st.markdown("---")
 
     # Exibir imagem na barra lateral
-    try:
-        image = Image.open("../img/Bank-Branding.jpg")
-        st.sidebar.image(image)
-    except FileNotFoundError:
-        st.sidebar.warning("Imagem não encontrada!")
+    sidebar_branding()
 
     # Medir o tempo de carregamento do arquivo
     start = timeit.default_timer()
@@ -1,15 +1,24 @@
 # Imports
+import math
+import os
+from itertools import combinations
+import numpy as np
 import pandas as pd
 import streamlit as st
 import seaborn as sns
 import matplotlib.pyplot as plt
-from PIL import Image
 from io import BytesIO
+from assets import page_icon, sidebar_branding
+from data_source import get_source
+from filter_presets import PresetWarmer, get_store
+from memory_governor import estimate_nbytes, get_governor
+from memory_tier import get_tier
+from multi_upload import SOURCE_COLUMN, append_categories, read_uploads, unify_categories
 
 # Configuração inicial da página
 st.set_page_config(
     page_title='Telemarketing Analysis',
-    page_icon='telmarketing_icon.png',
+    page_icon=page_icon(),
     layout="wide",
     initial_sidebar_state='expanded'
 )
@@ -18,33 +27,636 @@ st.set_page_config(
 custom_params = {"axes.spines.right": False, "axes.spines.top": False}
 sns.set_theme(style="ticks", rc=custom_params)
 
-# Função para carregar os dados
-@st.cache_data(show_spinner=True)
-def load_data(file_data):
+# Função para carregar os dados (todas as colunas ou apenas as informadas). Sem cache: o
+# resultado fica no estado da sessão, comprimido quando ocioso
+def load_data(file_data, columns=None):
     try:
-        return pd.read_csv(file_data, sep=';')
+        file_data.seek(0)
+        return pd.read_csv(file_data, sep=';', usecols=columns)
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo: {e}")
         return None
 
-# Função para aplicar filtro de múltipla seleção
-@st.cache_data
-def multiselect_filter(relatorio, col, selecionados):
-    if 'all' in selecionados and len(selecionados) > 1:
-        selecionados.remove('all')  # Remove 'all' se outros valores forem selecionados
-    if 'all' in selecionados:
-        return relatorio
+# Filtros de múltipla seleção (rótulo -> coluna)
+FILTERS = {
+    "Profissão": "job",
+    "Estado Civil": "marital",
+    "Default": "default",
+    "Tem financiamento imobiliário?": "housing",
+    "Tem empréstimo?": "loan",
+    "Meio de contato": "contact",
+    "Mês do contato": "month",
+    "Dia da semana": "day_of_week",
+    "Arquivo de origem": SOURCE_COLUMN,
+}
+
+# Filtros de faixa para as demais colunas numéricas (rótulo -> coluna)
+NUMERIC_FILTERS = {
+    "Duração do contato (s)": "duration",
+    "Contatos na campanha": "campaign",
+    "Dias desde o último contato": "pdays",
+    "Contatos anteriores": "previous",
+    "Taxa de variação do emprego": "emp.var.rate",
+    "Índice de preços ao consumidor": "cons.price.idx",
+    "Índice de confiança do consumidor": "cons.conf.idx",
+    "Euribor 3 meses": "euribor3m",
+    "Número de empregados": "nr.employed",
+}
+
+# Colunas mantidas na representação compacta (perfis únicos com peso)
+PROFILE_COLUMNS = ['age', *FILTERS.values(), 'y']
+
+# Colunas do CSV lidas na carga (a coluna de origem é gerada na leitura)
+BASE_COLUMNS = [c for c in PROFILE_COLUMNS if c != SOURCE_COLUMN]
+
+# Ordem de calendário das colunas de tempo (valores fora da lista ficam fora da tendência)
+CALENDAR_ORDER = {
+    'month': ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'],
+    'day_of_week': ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'],
+}
+
+# Faixas etárias usadas pelo buscador de segmentos
+AGE_BANDS = [0, 25, 35, 45, 55, 65, 200]
+AGE_BAND_LABELS = ['<25', '25-34', '35-44', '45-54', '55-64', '65+']
+
+# Função para criar o índice ordenado de uma coluna numérica (ordem das linhas, valores ordenados)
+def build_sorted_index(values):
+    values = np.asarray(values)
+    order = np.argsort(values, kind='stable')
+    if values.dtype.kind == 'f':
+        order = order[~np.isnan(values[order])]  # NaN fica fora de qualquer faixa
+    return order, values[order]
+
+# Função para incluir novas linhas no índice ordenado sem reordenar a base inteira
+def merge_sorted_index(index, new_values, offset):
+    order, values = index
+    new_order, new_sorted = build_sorted_index(new_values)
+    positions = np.searchsorted(values, new_sorted, side='right')
+    return np.insert(order, positions, new_order + offset), np.insert(values, positions, new_sorted)
+
+# Função para criar os índices ordenados das colunas numéricas filtráveis
+def build_sorted_indexes(bank_raw):
+    columns = ['age', *NUMERIC_FILTERS.values()]
+    return {
+        column: build_sorted_index(bank_raw[column])
+        for column in columns
+        if column in bank_raw.columns and pd.api.types.is_numeric_dtype(bank_raw[column])
+    }
+
+# Função para marcar as linhas com valor em [lo, hi] por busca binária no índice
+def range_mask(index, n, lo, hi):
+    order, values = index
+    start = np.searchsorted(values, lo, side='left')
+    stop = np.searchsorted(values, hi, side='right')
+    mask = np.zeros(n, dtype=bool)
+    mask[order[start:stop]] = True
+    return mask
+
+# Função para gerar a máscara dos filtros de múltipla seleção
+def category_mask(df, selected_filters):
+    mask = np.ones(len(df), dtype=bool)
+    for column, selected in selected_filters.items():
+        if 'all' in selected and len(selected) == 1:
+            continue  # 'all' sozinho não filtra; com outros valores é ignorado
+        mask &= df[column].isin([value for value in selected if value != 'all']).to_numpy()
+    return mask
+
+# Função para combinar os filtros de faixa (índices ordenados) e os de múltipla seleção
+def filter_mask(state, ranges, selected_filters):
+    bank_raw = state['dados']
+    mask = category_mask(bank_raw, selected_filters)
+    for column, (lo, hi) in ranges.items():
+        index = state['indices'][column]
+        if len(index[1]) and lo <= index[1][0] and hi >= index[1][-1]:
+            continue  # Faixa completa: nenhum filtro a aplicar
+        mask &= range_mask(index, len(bank_raw), lo, hi)
+    return mask
+
+# Função para corrigir p-valores por múltiplos testes (Benjamini-Hochberg, taxa de falsas descobertas)
+def benjamini_hochberg(p_values):
+    m = len(p_values)
+    order = np.argsort(p_values)
+    ranked = p_values[order] * m / np.arange(1, m + 1)
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1)
+    return adjusted
+
+# Função para contar clientes e conversões por segmento (uma e duas dimensões, faixa etária
+# incluída). As contagens são aditivas: as de um delta somam-se às da base
+def segment_counts(bank_raw):
+    weights = row_weights(bank_raw)
+    converted = weights * (bank_raw['y'] == 'yes').to_numpy()
+
+    # Codificar cada dimensão uma única vez (faixa etária incluída)
+    ages = pd.cut(bank_raw['age'], bins=AGE_BANDS, labels=AGE_BAND_LABELS, right=False)
+    dims = {column: bank_raw[column] for column in FILTERS.values()}
+    dims['age'] = ages
+    codes, levels = {}, {}
+    for column, values in dims.items():
+        codes[column], uniques = pd.factorize(values, sort=True)
+        levels[column] = np.asarray(uniques, dtype=object)
+
+    # Contagens de contingência vetorizadas: um bincount por combinação de colunas
+    counts = {'total': pd.Series({'clientes': weights.sum(), 'yes': converted.sum()})}
+    for size in (1, 2):
+        for columns in combinations(dims, size):
+            key = np.zeros(len(bank_raw), dtype=np.int64)
+            valid = np.ones(len(bank_raw), dtype=bool)  # Valores vazios (código -1) ficam fora da combinação
+            shape = []
+            for column in columns:
+                key = key * len(levels[column]) + codes[column]
+                valid &= codes[column] >= 0
+                shape.append(len(levels[column]))
+            cells = int(np.prod(shape))
+            clientes = np.bincount(key[valid], weights=weights[valid], minlength=cells)
+            yes = np.bincount(key[valid], weights=converted[valid], minlength=cells)
+            present = np.flatnonzero(clientes)
+            idx = np.unravel_index(present, shape)
+            index = pd.MultiIndex.from_arrays([levels[column][i] for column, i in zip(columns, idx)], names=columns)
+            counts[columns] = pd.DataFrame({'clientes': clientes[present], 'yes': yes[present]}, index=index)
+    return counts
+
+# Função para somar as contagens de segmentos de um delta às da base
+def add_segment_counts(counts, delta_counts):
+    return {key: value.add(delta_counts[key], fill_value=0) for key, value in counts.items()}
+
+# Função para ranquear segmentos pelo lift de conversão a partir das contagens
+def rank_segments(counts, top_n=10, min_support=30, alpha=0.05):
+    n, total_yes = counts['total']['clientes'], counts['total']['yes']
+    base_rate = total_yes / n if n else 0
+
+    segments = []
+    for columns, table in counts.items():
+        if columns == 'total':
+            continue
+        table = table[table['clientes'] >= min_support]
+        for values, row in zip(table.index, table.itertuples(index=False)):
+            values = values if isinstance(values, tuple) else (values,)
+            segments.append((dict(zip(columns, values)), row.clientes, row.yes))
+
+    if not segments or base_rate in (0, 1):
+        return pd.DataFrame()
+
+    presets, counts, yes = zip(*segments)
+    counts, yes = np.array(counts), np.array(yes)
+
+    # Teste z de duas proporções: segmento contra o restante da base
+    rate = yes / counts
+    rest = np.maximum(n - counts, 1)
+    rest_rate = (total_yes - yes) / rest
+    se = np.sqrt(base_rate * (1 - base_rate) * (1 / counts + 1 / rest))
+    z = np.divide(rate - rest_rate, se, out=np.zeros_like(rate), where=se > 0)
+    p_value = np.array([math.erfc(abs(v) / math.sqrt(2)) for v in z])
+    q_value = benjamini_hochberg(p_value)
+
+    result = pd.DataFrame({
+        'segmento': [' & '.join(f'{c}={v}' for c, v in preset.items()) for preset in presets],
+        'clientes': counts.astype(int),
+        'conversão (%)': rate * 100,
+        'lift': rate / base_rate,
+        'z': z,
+        'p-valor': p_value,
+        'p-ajustado (Benjamini-Hochberg)': q_value,
+        'filtros': presets,
+    })
+    # Milhares de segmentos testados: a significância usa o p-valor corrigido, não o bruto
+    result = result[result['p-ajustado (Benjamini-Hochberg)'] < alpha]
+    return result.sort_values('lift', ascending=False).head(top_n).reset_index(drop=True)
+
+# Callback para aplicar um segmento como preset dos filtros do formulário
+def apply_segment_preset(filtros, min_age, max_age):
+    for column in FILTERS.values():
+        st.session_state[f'filtro_{column}'] = [filtros[column]] if column in filtros else ['all']
+    if 'age' in filtros:
+        lo, hi = AGE_BANDS[AGE_BAND_LABELS.index(filtros['age']):][:2]
+        st.session_state['idades'] = (max(lo, min_age), min(hi - 1, max_age))
     else:
-        return relatorio[relatorio[col].isin(selecionados)].reset_index(drop=True)
+        st.session_state['idades'] = (min_age, max_age)
+    for key, limit in st.session_state.get('limites', {}).items():
+        if key.startswith('faixa_'):
+            st.session_state[key] = limit
+    st.session_state['aplicar_filtros'] = True  # Preset vale como envio do formulário
+    st.session_state.pop('filtro_salvo', None)
 
-# Função para converter o DataFrame para Excel
+# Função para colapsar linhas idênticas nas colunas filtradas em perfis com peso
+def collapse_profiles(bank):
+    return (bank.groupby(PROFILE_COLUMNS, dropna=False, observed=True)
+                .size()
+                .rename('clientes')
+                .reset_index())
+
+# Função para somar os perfis de um delta a uma tabela de perfis: os que já existem só têm o
+# peso somado na posição atual; os novos entram no fim (devolvidos para atualizar os índices)
+def merge_profiles(profiles, delta_profiles):
+    profiles, delta_profiles = append_categories(profiles, delta_profiles, FILTERS.values())
+    positions = delta_profiles[PROFILE_COLUMNS].merge(
+        profiles[PROFILE_COLUMNS].assign(posicao=np.arange(len(profiles))), on=PROFILE_COLUMNS, how='left'
+    )['posicao'].to_numpy()
+    existing = ~np.isnan(positions)
+    clientes = profiles['clientes'].to_numpy().copy()
+    np.add.at(clientes, positions[existing].astype(np.int64), delta_profiles['clientes'].to_numpy()[existing])
+    profiles['clientes'] = clientes
+    new = delta_profiles[~existing]
+    return pd.concat([profiles, new], ignore_index=True), new
+
+# Função para carregar um ou mais arquivos enviados (lidos em paralelo, com a coluna de origem)
+def load_files(files, columns=None):
+    try:
+        return read_uploads(files, columns, categorical=tuple(FILTERS.values()))
+    except Exception as e:
+        st.error(f"Erro ao carregar o arquivo: {e}")
+        return None
+
+# Função para projetar a base do servidor, marcando a origem como nos uploads
+def server_frame(fonte, name):
+    frame = fonte[BASE_COLUMNS].assign(**{SOURCE_COLUMN: name})
+    return unify_categories([frame], FILTERS.values())[0]
+
+# Peso de cada linha: contagem do perfil na base compacta, 1 na base completa
+def row_weights(df):
+    if 'clientes' in df.columns:
+        return df['clientes'].to_numpy(dtype=float)
+    return np.ones(len(df))
+
+# Função para expandir perfis de volta em linhas (apenas para prévia e exportação)
+def expand_profiles(df):
+    if 'clientes' not in df.columns:
+        return df
+    return df.loc[df.index.repeat(df['clientes'])].drop(columns='clientes').reset_index(drop=True)
+
+# Função para contar y, ponderada na base compacta
+def target_counts(df):
+    if 'clientes' in df.columns:
+        return df.groupby('y')['clientes'].sum()
+    return df['y'].value_counts()
+
+# Função para calcular a proporção (%) de y a partir das contagens
+def target_perc(df=None, counts=None):
+    counts = target_counts(df) if counts is None else counts
+    return counts.div(counts.sum()).mul(100).rename('proportion')
+
+# Função para ordenar as opções de um filtro (ordem de calendário nas colunas de tempo)
+def sort_options(column, options):
+    order = CALENDAR_ORDER.get(column)
+    if order is None:
+        return options
+    return sorted(options, key=lambda value: order.index(value) if value in order else len(order))
+
+# Função para contar volume e conversões por período, com bincount sobre os códigos de calendário.
+# As contagens são aditivas: as de um delta somam-se às da base
+def time_trends(df):
+    weights = row_weights(df)
+    converted = weights * (df['y'] == 'yes').to_numpy()
+    trends = {}
+    for column, order in CALENDAR_ORDER.items():
+        codes = pd.Categorical(df[column], categories=order).codes
+        valid = codes >= 0
+        volume = np.bincount(codes[valid], weights=weights[valid], minlength=len(order))
+        yes = np.bincount(codes[valid], weights=converted[valid], minlength=len(order))
+        trends[column] = pd.DataFrame({'volume': volume, 'yes': yes}, index=pd.Index(order, name=column))
+    return trends
+
+# Função para derivar a taxa de conversão (%) das contagens por período
+def trend_rates(trends):
+    rates = {}
+    for column, counts in trends.items():
+        volume, yes = counts['volume'].to_numpy(), counts['yes'].to_numpy()
+        rate = np.divide(yes, volume, out=np.zeros_like(volume), where=volume > 0) * 100
+        rates[column] = pd.DataFrame({'volume': volume.astype(int), 'conversão (%)': rate}, index=counts.index)
+    return rates
+
+# Função para ler o esquema completo (cabeçalho + coluna de origem) de uma fonte
+def source_columns(fonte):
+    if isinstance(fonte, pd.DataFrame):
+        return [*fonte.columns, SOURCE_COLUMN]
+    fonte.seek(0)
+    return [*pd.read_csv(fonte, sep=';', nrows=0).columns, SOURCE_COLUMN]
+
+# Função para ler colunas de uma fonte (arquivo enviado ou base do servidor)
+def read_columns(fonte, columns):
+    if isinstance(fonte, pd.DataFrame):
+        return fonte[columns].reset_index(drop=True)
+    return load_data(fonte, columns)
+
+# Função para carregar sob demanda colunas fora da projeção inicial
+def materialize_columns(state, columns):
+    bank_raw = state['dados']
+    missing = [c for c in state['colunas'] if c in columns and c not in bank_raw.columns]
+    if not missing or 'clientes' in bank_raw.columns:
+        return
+    parts = [read_columns(fonte, missing) for fonte in state['fontes']]
+    if any(part is None for part in parts):
+        return
+    extra = pd.concat(parts, ignore_index=True)
+    bank_raw = pd.concat([bank_raw, extra], axis=1)
+    state['dados'] = bank_raw[[c for c in state['colunas'] if c in bank_raw.columns]]
+    indices = build_sorted_indexes(extra)
+    state['indices'].update(indices)
+    state['nbytes'] += estimate_nbytes(extra) + estimate_nbytes(indices)
+
+# Função para montar o estado incremental da base carregada
+def build_dataset_state(bank_raw, fontes, colunas):
+    state = {
+        'dados': bank_raw,
+        'fontes': fontes,
+        'colunas': colunas,
+        'opcoes': {column: sort_options(column, bank_raw[column].unique().tolist()) for column in FILTERS.values()},
+        'idades': (int(bank_raw.age.min()), int(bank_raw.age.max())),
+        'alvo': target_counts(bank_raw),
+        'perfis': None,
+        'tendencias': None,
+        'segmentos': None,
+        'indices': build_sorted_indexes(bank_raw),
+        'deltas': set(),
+    }
+    state['nbytes'] = estimate_nbytes(bank_raw) + estimate_nbytes(state['indices'])
+    return state
+
+# Função para obter os perfis da base, calculados uma vez e mantidos pelos deltas
+def dataset_profiles(state):
+    if 'clientes' in state['dados'].columns:
+        return state['dados']
+    if state['perfis'] is None:
+        state['perfis'] = collapse_profiles(state['dados'])
+    return state['perfis']
+
+# Função para obter as contagens por período da base bruta, calculadas uma vez e mantidas pelos deltas
+def dataset_trends(state):
+    if state['tendencias'] is None:
+        state['tendencias'] = time_trends(state['dados'])
+    return state['tendencias']
+
+# Função para obter as contagens de segmentos da base, calculadas uma vez e mantidas pelos deltas
+def dataset_segment_counts(state):
+    if state['segmentos'] is None:
+        state['segmentos'] = segment_counts(state['dados'])
+    return state['segmentos']
+
+# Função para incorporar um arquivo delta, atualizando só as estruturas afetadas
+def append_delta(state, delta, fonte):
+    bank_raw = state['dados']
+    if set(delta.columns) != set(bank_raw.columns):
+        raise ValueError("O arquivo delta não tem as mesmas colunas da base carregada.")
+    if delta.empty:
+        return
+    state['fontes'].append(fonte)
+    delta = delta[bank_raw.columns]
+    if 'clientes' in bank_raw.columns:
+        state['dados'], new = merge_profiles(bank_raw, delta)
+    else:
+        state['dados'] = pd.concat(append_categories(bank_raw, delta, FILTERS.values()), ignore_index=True)
+        if state['perfis'] is not None:
+            state['perfis'] = merge_profiles(state['perfis'], collapse_profiles(delta))[0]
+        new = delta
+    # Perfis já existentes mantêm posição e valores: só as linhas novas entram nos índices
+    for column, index in state['indices'].items():
+        state['indices'][column] = merge_sorted_index(index, new[column], len(bank_raw))
+
+    # Novas categorias entram no fim das listas de opções (no calendário, na sua posição)
+    for column, options in state['opcoes'].items():
+        known = set(options)
+        options.extend(value for value in delta[column].unique() if value not in known)
+        options[:] = sort_options(column, options)
+    if state['segmentos'] is not None:
+        state['segmentos'] = add_segment_counts(state['segmentos'], segment_counts(delta))
+    if state['tendencias'] is not None:
+        delta_trends = time_trends(delta)
+        state['tendencias'] = {column: counts + delta_trends[column] for column, counts in state['tendencias'].items()}
+    state['idades'] = (min(state['idades'][0], int(delta.age.min())),
+                       max(state['idades'][1], int(delta.age.max())))
+    state['alvo'] = state['alvo'].add(target_counts(delta), fill_value=0)
+    state['nbytes'] += estimate_nbytes(delta)
+
+# Função para gerar a máscara de um conjunto de filtros sobre os perfis
+def profile_mask(profiles, idades, selected_filters):
+    mask = profiles['age'].between(idades[0], idades[1]).to_numpy()
+    return mask & category_mask(profiles, selected_filters)
+
+# Função para avaliar vários conjuntos de filtros sobre os mesmos perfis
+def compare_filter_sets(profiles, filter_sets, breakdown):
+    summary, details = [], []
+    for name, (idades, selected_filters) in filter_sets.items():
+        subset = profiles[profile_mask(profiles, idades, selected_filters)]
+        clientes = int(subset['clientes'].sum())
+        yes = int(subset.loc[subset['y'] == 'yes', 'clientes'].sum())
+        summary.append({
+            'conjunto': name,
+            'clientes': clientes,
+            'no (%)': 100 * (clientes - yes) / clientes if clientes else 0.0,
+            'yes (%)': 100 * yes / clientes if clientes else 0.0,
+        })
+        grouped = (subset.assign(yes=subset['clientes'].where(subset['y'] == 'yes', 0))
+                         .groupby(breakdown, observed=True)[['clientes', 'yes']].sum())
+        grouped['conversão (%)'] = 100 * grouped['yes'] / grouped['clientes']
+        details.append(grouped.drop(columns='yes').add_prefix(f'{name} - '))
+    return pd.DataFrame(summary), pd.concat(details, axis=1).fillna(0)
+
+# Função para calcular os limites dos filtros de faixa, lidos nas pontas dos índices ordenados
+def range_limits(state):
+    limits = {'idades': state['idades']}
+    for column in NUMERIC_FILTERS.values():
+        values = state['indices'].get(column, (None, []))[1]
+        if len(values) and values[0] < values[-1]:
+            limits[f'faixa_{column}'] = (values[0].item(), values[-1].item())
+    return limits
+
+# Chave do widget de faixa de cada coluna
+def range_key(column):
+    return 'idades' if column == 'age' else f'faixa_{column}'
+
+# Função para ajustar as seleções de um filtro salvo às opções da base atual
+def fit_selected(preset, opcoes):
+    selected = {}
+    for column in FILTERS.values():
+        values = [v for v in preset['selected'].get(column, ['all']) if v == 'all' or v in opcoes[column]]
+        selected[column] = values or ['all']
+    return selected
+
+# Função para ajustar um filtro salvo à base atual (seleções válidas e faixas dentro dos limites)
+def fit_preset(preset, state, limits):
+    ranges = {}
+    for column, (lo, hi) in preset['ranges'].items():
+        if range_key(column) in limits:
+            min_value, max_value = limits[range_key(column)]
+            ranges[column] = (max(lo, min_value), min(hi, max_value))
+    return ranges, fit_selected(preset, state['opcoes'])
+
+# Função para reajustar a especificação efetivada a uma nova versão da base: faixas completas
+# acompanham os novos limites, as demais são recortadas como num filtro salvo
+def refit_committed(committed, state, limits, old_limits):
+    ranges = {column: value for column, value in committed['ranges'].items()
+              if tuple(value) != tuple(old_limits.get(range_key(column), ()))}
+    ranges, selected = fit_preset({'ranges': ranges, 'selected': committed['selected']}, state, limits)
+    return {**committed, 'ranges': ranges, 'selected': selected}
+
+# Callback para aplicar um filtro salvo aos widgets do formulário
+def apply_saved_preset(name, preset, opcoes):
+    for column, values in fit_selected(preset, opcoes).items():
+        st.session_state[f'filtro_{column}'] = values
+    for key, limit in st.session_state.get('limites', {}).items():
+        st.session_state[key] = limit
+    for column, value in preset['ranges'].items():
+        st.session_state[range_key(column)] = tuple(value)  # Ajustada aos limites no rerun
+    if any(column in NUMERIC_FILTERS.values() for column in preset['ranges']):
+        st.session_state['filtros_numericos'] = True
+    st.session_state['tipo_grafico'] = preset['graph_type']
+    st.session_state['aplicar_filtros'] = True
+    st.session_state['filtro_salvo'] = (name, preset['saved'])
+
+# Callback para salvar os filtros aplicados (só faixas diferentes dos limites e seleções diferentes de 'all')
+def save_current_filters(store, warmer):
+    name = st.session_state.get('nome_novo_filtro', '').strip()
+    committed = st.session_state.get('filtros_aplicados')
+    if not name or committed is None:
+        return
+    limits = st.session_state.get('limites', {})
+    store.save(name, {
+        'graph_type': committed['graph_type'],
+        'ranges': {column: list(value) for column, value in committed['ranges'].items()
+                   if tuple(value) != tuple(limits.get(range_key(column), ()))},
+        'selected': {column: list(selected) for column, selected in committed['selected'].items()
+                     if selected != ['all']},
+    })
+    st.session_state['nome_novo_filtro'] = ''
+    if warmer is not None:
+        warmer.wake()
+
+# Callback para excluir um filtro salvo
+def delete_saved_preset(store, warmer, name):
+    store.delete(name)
+    st.session_state.pop('nome_filtro_salvo', None)
+    st.session_state.pop('filtro_salvo', None)
+    if warmer is not None:
+        warmer.wake()
+
+# Função para montar o estado usado no aquecimento (o aquecedor o guarda por versão da base)
+def warm_context(fonte, name):
+    state = build_dataset_state(server_frame(fonte, name), [fonte], source_columns(fonte))
+    materialize_columns(state, NUMERIC_FILTERS.values())
+    return state, range_limits(state)
+
+# Função para pré-calcular um filtro salvo: linhas, proporções de y e Excel com todas as colunas
+def warm_preset(context, preset):
+    state, limits = context
+    ranges, selected = fit_preset(preset, state, limits)
+    rows = np.flatnonzero(filter_mask(state, ranges, selected))
+    fonte = state['fontes'][0]
+    export = fonte.iloc[rows].reset_index(drop=True)
+    export[SOURCE_COLUMN] = state['dados'][SOURCE_COLUMN].iloc[rows].to_numpy()
+    return {
+        'linhas': rows,
+        'proporcao': target_perc(state['dados'].iloc[rows]),
+        'excel': to_excel(export),
+    }
+
+# Aquecedor dos filtros salvos sobre a base do servidor (um por processo)
 @st.cache_resource
+def get_warmer(server_path):
+    name = os.path.basename(server_path)
+    return PresetWarmer(get_source(server_path), get_store(), lambda fonte: warm_context(fonte, name), warm_preset)
+
+# Callback para pedir a exportação de um filtro (carrega as colunas restantes no próximo rerun)
+def request_export(spec):
+    st.session_state['exportar'] = spec
+
+# Função para converter o DataFrame para Excel
 def to_excel(df):
     output = BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='Sheet1')
     return output.getvalue()
 
+# Função para montar os gráficos de proporção de y (dados brutos x filtrados)
+def plot_target(raw_perc, bank_perc, graph_type):
+    fig, ax = plt.subplots(1, 2, figsize=(10, 5))
+    for axis, perc, title in zip(ax, (raw_perc, bank_perc), ('Dados Brutos', 'Dados Filtrados')):
+        if graph_type == 'Barras':
+            perc = perc.reset_index()
+            perc.columns = ['y', 'proportion']
+            sns.barplot(
+                x='y',
+                y='proportion',
+                data=perc,
+                ax=axis,
+                hue='y',
+                palette={'no': 'blue', 'yes': 'orange'},
+                legend=False
+            )
+        else:
+            axis.pie(
+                perc,
+                labels=perc.index,
+                autopct='%1.1f%%',
+                colors=['blue', 'orange']
+            )
+        axis.set_title(title)
+    return fig
+
+# Função para montar a comparação: um painel para os dados brutos e um para cada conjunto
+def plot_comparison(raw_perc, summary):
+    fig, ax = plt.subplots(1, len(summary) + 1, figsize=(5 * (len(summary) + 1), 5), sharey=True)
+    panels = [('Dados Brutos', raw_perc)]
+    for row in summary.to_dict('records'):
+        panels.append((f"Conjunto {row['conjunto']} (n={row['clientes']})",
+                       pd.Series({'no': row['no (%)'], 'yes': row['yes (%)']})))
+    for axis, (title, perc) in zip(ax, panels):
+        sns.barplot(
+            x=perc.index,
+            y=perc.values,
+            ax=axis,
+            hue=perc.index,
+            palette={'no': 'blue', 'yes': 'orange'},
+            legend=False
+        )
+        axis.set_title(title)
+    return fig
+
+# Função para montar a tendência por mês e dia da semana (volume filtrado e conversão bruta x filtrada)
+def plot_trends(raw_trends, bank_trends):
+    fig, ax = plt.subplots(1, 2, figsize=(14, 4))
+    for axis, (column, title) in zip(ax, (('month', 'Mês'), ('day_of_week', 'Dia da semana'))):
+        raw, bank = raw_trends[column], bank_trends[column]
+        periods = raw.index[raw['volume'] > 0]  # Só os períodos presentes na base
+        axis.bar(periods, bank.loc[periods, 'volume'], color='lightgray', label='Volume (filtrado)')
+        axis.set_ylabel('Volume (filtrado)')
+        rate_axis = axis.twinx()
+        rate_axis.plot(periods, raw.loc[periods, 'conversão (%)'], marker='o', color='blue', label='Conversão (brutos)')
+        rate_axis.plot(periods, bank.loc[periods, 'conversão (%)'], marker='o', color='orange', label='Conversão (filtrados)')
+        rate_axis.set_ylabel('Conversão (%)')
+        axis.set_title(title)
+    handles = [h for axis in (ax[-1], rate_axis) for h in axis.get_legend_handles_labels()[0]]
+    rate_axis.legend(handles, [h.get_label() for h in handles], loc='upper right')
+    return fig
+
+# Função para renderizar a figura em PNG e liberar a figura do matplotlib
+def render_png(fig):
+    output = BytesIO()
+    fig.savefig(output, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return output.getvalue()
+
+# Função para preencher o painel de diagnóstico de memória (bases e artefatos de todas as sessões,
+# camadas das bases ociosas), depois que a base da sessão já foi obtida e contabilizada
+def show_memory_diagnostics(panel, governor, tier, warmer):
+    with panel:
+        usage, evictions = governor.usage()
+        st.caption(f"Orçamento por sessão: {governor.session_budget / 2**20:.0f} MB · "
+                   f"global: {governor.global_budget / 2**20:.0f} MB · descartes: {evictions}")
+        if not usage.empty and usage['bases acima do orçamento'].any():
+            st.warning(f"{int(usage['bases acima do orçamento'].sum())} sessão(ões) com a base acima do "
+                       "orçamento: só os artefatos do rerun atual são mantidos.")
+        if warmer is not None:
+            warmed, warmed_bytes, failed = warmer.usage()
+            st.caption(f"Filtros salvos pré-calculados: {warmed} ({warmed_bytes / 2**20:.1f} MB)"
+                       + (f" · falhas: {failed}" if failed else ''))
+        if not usage.empty:
+            st.metric('Total em uso (MB)', f"{usage['total (MB)'].sum():.1f}")
+            st.dataframe(usage, hide_index=True)
+        tiers = tier.stats()
+        if not tiers.empty:
+            st.caption(f"Bases comprimidas após {tier.compress_after:.0f} s sem uso")
+            st.dataframe(tiers, hide_index=True)
+
 # Função principal
 def main():
     # Título principal da aplicação
@@ -52,141 +664,326 @@ def main():
     st.markdown("---")
     
     # Apresentar a imagem na barra lateral
-    try:
-        image = Image.open("Bank-Branding.jpg")
-        st.sidebar.image(image)
-    except FileNotFoundError:
-        st.sidebar.warning("Imagem não encontrada!")
+    sidebar_branding()
+
+    # Base do servidor (TELEMARKETING_DATA) e aquecedor dos filtros salvos sobre ela
+    server_path = os.environ.get('TELEMARKETING_DATA')
+    warmer = get_warmer(server_path) if server_path else None
+
+    # Governador de memória e camadas das bases ociosas
+    governor = get_governor()
+    governor.begin_run()
+    tier = get_tier()
+    diagnostics = st.sidebar.expander('📊 Diagnóstico de memória')  # Preenchido após obter a base
 
-    # Upload do arquivo
-    st.sidebar.write("## Suba o arquivo")
-    data_file_1 = st.sidebar.file_uploader("Bank marketing data", type=['csv', 'xlsx'])
+    # Upload dos arquivos (um ou vários, por exemplo um por região ou mês)
+    st.sidebar.write("## Suba os arquivos")
+    data_files = st.sidebar.file_uploader("Bank marketing data", type=['csv', 'xlsx'], accept_multiple_files=True)
+    compact = st.sidebar.checkbox(
+        'Representação compacta',
+        help='Colapsa clientes idênticos nas colunas filtradas em perfis únicos com peso.'
+    )
+
+    # Sem upload, usa a base do servidor quando configurada
+    if data_files:
+        dataset_id = tuple(f.file_id for f in data_files)
+    elif server_path:
+        snapshot = get_source(server_path).snapshot()
+        dataset_id = f'{server_path}@{snapshot.version}'
 
     # Verificar se o arquivo foi carregado
-    if data_file_1 is not None:
-        bank_raw = load_data(data_file_1)
-        if bank_raw is None:
-            return
+    if data_files or server_path:
+        # Estado da base mantido na sessão; deltas são incorporados incrementalmente.
+        # Na carga só entram as colunas de filtros e gráficos; as demais são lidas sob demanda.
+        # Bases ociosas são comprimidas em memória e reidratadas aqui, no próximo acesso.
+        stored = st.session_state.get('base')
+        state = stored.get() if stored is not None else None
+        if state is None or state['id'] != (dataset_id, compact):
+            if data_files:
+                fontes = list(data_files)
+                bank_raw = load_files(fontes, PROFILE_COLUMNS)
+            else:
+                fontes = [snapshot.data]
+                bank_raw = server_frame(fontes[0], os.path.basename(server_path))
+            if bank_raw is None:
+                show_memory_diagnostics(diagnostics, governor, tier, warmer)
+                return
+            if compact:
+                bank_raw = collapse_profiles(bank_raw)
+            state = build_dataset_state(bank_raw, fontes, source_columns(fontes[0]))
+            state['id'] = (dataset_id, compact)
+            st.session_state['base'] = tier.register(state)
+            st.session_state.pop('exportar', None)
+
+        delta_file = st.sidebar.file_uploader("Arquivo incremental (delta)", type=['csv'])
+        if delta_file is not None and delta_file.file_id not in state['deltas']:
+            if set(source_columns(delta_file)) != set(state['colunas']):
+                st.sidebar.error("O arquivo delta não tem as mesmas colunas da base carregada.")
+            else:
+                columns = PROFILE_COLUMNS if compact else state['dados'].columns.tolist()
+                delta = load_files([delta_file], columns)
+                if delta is not None and compact:
+                    delta = collapse_profiles(delta)
+                if delta is not None:
+                    append_delta(state, delta, delta_file)
+                    state['deltas'].add(delta_file.file_id)
+                    st.sidebar.success(f"Delta incorporado: {int(row_weights(delta).sum())} novas linhas.")
+
+        # Colunas restantes: carregadas só para filtros numéricos, prévia completa ou exportação
+        numeric_filters = st.sidebar.checkbox('Filtros de indicadores numéricos', disabled=compact,
+                                              key='filtros_numericos')
+        if numeric_filters:
+            materialize_columns(state, NUMERIC_FILTERS.values())
+        if st.session_state.get('previa_completa') or st.session_state.get('exportar'):
+            materialize_columns(state, state['colunas'])
 
-        bank = bank_raw.copy()
+        bank_raw = state['dados']
+        governor.track_dataset('base', state['nbytes'])
+        show_memory_diagnostics(diagnostics, governor, tier, warmer)
+
+        # Limites das faixas de idade e numéricas
+        limits = range_limits(state)
+        min_age, max_age = limits['idades']
+
+        # A especificação efetivada sobrevive às mudanças da base (novo arquivo, nova versão
+        # ou delta): é reajustada às novas opções e limites, sem ler os widgets pendentes
+        base_version = (state['id'], len(state['deltas']))
+        committed = st.session_state.get('filtros_aplicados')
+        if committed is not None and committed['base'] != base_version:
+            committed = refit_committed(committed, state, limits, st.session_state.get('limites', {}))
+            committed['base'] = base_version
+            st.session_state['filtros_aplicados'] = committed
+            st.session_state.pop('filtro_salvo', None)  # Reajustada: já não é o filtro salvo pré-calculado
+
+        # Widgets dos filtros: num novo arquivo, partem da especificação efetivada
+        if st.session_state.get('arquivo_id') != dataset_id:
+            st.session_state['arquivo_id'] = dataset_id
+            st.session_state.update(limits)
+            for column in FILTERS.values():
+                st.session_state[f'filtro_{column}'] = committed['selected'][column] if committed else ['all']
+            for column, value in (committed['ranges'].items() if committed else ()):
+                st.session_state[range_key(column)] = value
+        else:
+            # Reatribui os valores para que sobrevivam à mudança de limites e opções após um delta
+            old_limits = st.session_state.get('limites', {})
+            for key, (lo, hi) in limits.items():
+                current = tuple(st.session_state.get(key, (lo, hi)))
+                if current == old_limits.get(key):
+                    current = (lo, hi)  # Faixa completa acompanha os novos limites
+                st.session_state[key] = (max(current[0], lo), min(current[1], hi))
+            for column in FILTERS.values():
+                st.session_state[f'filtro_{column}'] = st.session_state.get(f'filtro_{column}', ['all'])
+        st.session_state['limites'] = limits
 
         st.write('## Dados Antes dos Filtros')
-        st.write(bank_raw.head())
+        if compact:
+            st.caption(f"Base compacta: {len(bank_raw)} perfis representando "
+                       f"{int(bank_raw['clientes'].sum())} clientes.")
+        st.write(expand_profiles(bank_raw.head()).head())
+        st.checkbox('Prévia com todas as colunas', key='previa_completa', disabled=compact)
+
+        # Busca automática de segmentos com maior lift
+        if st.checkbox('🔎 Encontrar segmentos com maior lift'):
+            col_top, col_min = st.columns(2)
+            top_n = col_top.number_input('Quantidade de segmentos', 1, 50, 10)
+            min_support = col_min.number_input('Mínimo de clientes por segmento', 1, value=30)
+            segments_key = ('segmentos', base_version, top_n, min_support)
+            segments = governor.get(segments_key)
+            if segments is None:
+                segments = governor.put(segments_key, rank_segments(dataset_segment_counts(state), top_n, min_support),
+                                        'segmentos')
+            if segments.empty:
+                st.info("Nenhum segmento significativo encontrado.")
+            else:
+                st.caption("Significância a 5% com correção de Benjamini-Hochberg sobre todos os segmentos pontuados.")
+                st.dataframe(segments.drop(columns='filtros'), hide_index=True)
+                for i, row in segments.iterrows():
+                    st.button(
+                        f"Aplicar: {row['segmento']}",
+                        key=f'segmento_{i}',
+                        on_click=apply_segment_preset,
+                        args=(row['filtros'], min_age, max_age)
+                    )
+        st.markdown("---")
+
+        # Comparação de vários conjuntos de filtros nomeados
+        if st.checkbox('⚖️ Comparar conjuntos de filtros'):
+            set_names = ['A', 'B', 'C'][:st.radio('Quantidade de conjuntos', (2, 3), horizontal=True)]
+            with st.form(key='comparison_form'):
+                filter_sets = {}
+                for name, col in zip(set_names, st.columns(len(set_names))):
+                    col.write(f'#### Conjunto {name}')
+                    comp_idades = col.slider(
+                        'Idade', min_age, max_age, (min_age, max_age), key=f'comp_{name}_idades'
+                    )
+                    comp_filters = {}
+                    for label, column in FILTERS.items():
+                        options = state['opcoes'][column] + ['all']
+                        comp_filters[column] = col.multiselect(
+                            label, options, default=['all'], key=f'comp_{name}_{column}'
+                        )
+                    filter_sets[name] = (comp_idades, comp_filters)
+                breakdown = st.selectbox('Quebrar por', list(FILTERS.values()))
+                st.form_submit_button(label='Comparar')
+
+            # Resumo, quebra e gráfico guardados por versão da base, conjuntos e quebra
+            comparison_key = ('comparacao', base_version, breakdown, tuple(
+                (name, tuple(comp_idades), tuple((column, tuple(selected)) for column, selected in comp_filters.items()))
+                for name, (comp_idades, comp_filters) in filter_sets.items()
+            ))
+            comparison = governor.get(comparison_key)
+            if comparison is None:
+                summary, details = compare_filter_sets(dataset_profiles(state), filter_sets, breakdown)
+                fig = plot_comparison(target_perc(counts=state['alvo']), summary)
+                comparison = governor.put(comparison_key, {
+                    'resumo': summary,
+                    'quebra': details,
+                    'grafico': render_png(fig),
+                }, 'gráfico')
+            st.dataframe(comparison['resumo'], hide_index=True)
+            st.image(comparison['grafico'])
+            st.dataframe(comparison['quebra'])
+        st.markdown("---")
+
+        # Filtros salvos (persistidos no servidor e pré-calculados em segundo plano)
+        store = get_store()
+        presets = store.load()
+        with st.sidebar.expander('⭐ Filtros salvos'):
+            if presets:
+                name = st.selectbox('Filtro salvo', sorted(presets), key='nome_filtro_salvo')
+                col_apply, col_delete = st.columns(2)
+                col_apply.button('Usar', on_click=apply_saved_preset, args=(name, presets[name], state['opcoes']))
+                col_delete.button('Excluir', on_click=delete_saved_preset, args=(store, warmer, name))
+            st.text_input('Nome para os filtros aplicados', key='nome_novo_filtro')
+            st.button('💾 Salvar filtros aplicados', on_click=save_current_filters, args=(store, warmer))
 
         # Criar os filtros
         with st.sidebar.form(key='my_form'):
-            graph_type = st.radio('Tipo de gráfico:', ('Barras', 'Pizza'))
+            graph_type = st.radio('Tipo de gráfico:', ('Barras', 'Pizza'), key='tipo_grafico')
 
             # Filtro de Idades
-            max_age = int(bank.age.max())
-            min_age = int(bank.age.min())
             idades = st.slider(
                 label='Idade',
                 min_value=min_age,
                 max_value=max_age,
-                value=(min_age, max_age),
-                step=1
+                step=1,
+                key='idades'
             )
 
             # Filtros de múltipla seleção
-            filters = {
-                "Profissão": "job",
-                "Estado Civil": "marital",
-                "Default": "default",
-                "Tem financiamento imobiliário?": "housing",
-                "Tem empréstimo?": "loan",
-                "Meio de contato": "contact",
-                "Mês do contato": "month",
-                "Dia da semana": "day_of_week",
-            }
-
             selected_filters = {}
-            for label, column in filters.items():
-                options = bank[column].unique().tolist()
-                options.append('all')
-                selected = st.multiselect(label, options, default=['all'])
-                selected_filters[column] = selected
+            for label, column in FILTERS.items():
+                options = state['opcoes'][column] + ['all']
+                selected = st.multiselect(label, options, key=f'filtro_{column}')
+                selected_filters[column] = list(selected)
 
-            # Aplicar os filtros
-            bank = bank.query("age >= @idades[0] and age <= @idades[1]")
-            for column, selected in selected_filters.items():
-                bank = multiselect_filter(bank, column, selected)
+            # Filtros de faixa dos indicadores numéricos
+            ranges = {'age': idades}
+            with st.expander('Indicadores numéricos'):
+                if compact:
+                    st.caption("Indisponível na representação compacta.")
+                elif not numeric_filters:
+                    st.caption("Ative 'Filtros de indicadores numéricos' para carregar estas colunas.")
+                for label, column in NUMERIC_FILTERS.items():
+                    if f'faixa_{column}' in limits:
+                        lo, hi = limits[f'faixa_{column}']
+                        ranges[column] = st.slider(label, min_value=lo, max_value=hi, key=f'faixa_{column}')
 
             submit_button = st.form_submit_button(label='Aplicar')
 
+        # Os widgets só alteram a especificação pendente; ela é efetivada no envio do
+        # formulário (ou preset). Os demais reruns, inclusive os que só carregam colunas,
+        # reutilizam a especificação efetivada e seus resultados memorizados.
+        preset_applied = st.session_state.pop('aplicar_filtros', False)
+        if submit_button or preset_applied or committed is None:
+            if submit_button or not preset_applied:
+                st.session_state.pop('filtro_salvo', None)  # Só um filtro salvo recém-aplicado usa o pré-cálculo
+            committed = {
+                'base': base_version,
+                'graph_type': graph_type,
+                'ranges': ranges,
+                'selected': selected_filters,
+            }
+            st.session_state['filtros_aplicados'] = committed
+        graph_type = committed['graph_type']
+        spec = (
+            committed['base'],
+            tuple(committed['ranges'].items()),
+            tuple((column, tuple(selected)) for column, selected in committed['selected'].items()),
+        )
+
+        # Resultado pré-calculado do filtro salvo em uso (base do servidor sem deltas)
+        warmed = None
+        saved = st.session_state.get('filtro_salvo')
+        if saved and warmer is not None and not data_files and not compact and not state['deltas']:
+            warmed = warmer.lookup(*saved, snapshot.version)
+
+        # Aplicar os filtros (tabela filtrada guardada por especificação e colunas carregadas)
+        all_columns = all(column in bank_raw.columns for column in state['colunas'])
+        table_key = ('filtrado', spec, len(bank_raw.columns))
+        bank = governor.get(table_key)
+        if bank is None:
+            if warmed is not None:
+                bank = bank_raw.iloc[warmed['linhas']].reset_index(drop=True)
+            else:
+                bank = bank_raw[filter_mask(state, committed['ranges'], committed['selected'])].reset_index(drop=True)
+            bank = governor.put(table_key, bank, 'tabela')
+
         # Exibir os dados filtrados
         st.write('## Dados Após os Filtros')
         if bank.empty:
             st.warning("Nenhum dado encontrado após aplicar os filtros.")
             return
-        st.write(bank.head())
-        st.markdown("---")
-
-        # Download dos dados filtrados
-        df_xlsx = to_excel(bank)
-        st.download_button(
-            label='📥 Download tabela filtrada em EXCEL',
-            data=df_xlsx,
-            file_name='bank_filtered.xlsx'
-        )
+        st.write(expand_profiles(bank.head()).head())
         st.markdown("---")
 
-        # Gráficos
-        if graph_type == 'Barras':
-            st.write("### Gráficos de Barras")
-            fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-            # Dados brutos
-            bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100).reset_index()
-            bank_raw_target_perc.columns = ['y', 'proportion']
-            sns.barplot(
-                x='y',
-                y='proportion',
-                data=bank_raw_target_perc,
-                ax=ax[0],
-                palette={'no': 'blue', 'yes': 'orange'}
-            )
-            ax[0].set_title('Dados Brutos')
-
-            # Dados filtrados
-            bank_target_perc = bank['y'].value_counts(normalize=True).mul(100).reset_index()
-            bank_target_perc.columns = ['y', 'proportion']
-            sns.barplot(
-                x='y',
-                y='proportion',
-                data=bank_target_perc,
-                ax=ax[1],
-                palette={'no': 'blue', 'yes': 'orange'}
+        # Download dos dados filtrados (preparado sob demanda, com todas as colunas)
+        excel_key = ('excel', spec, all_columns)
+        df_xlsx = governor.get(excel_key)
+        if df_xlsx is None and warmed is not None:
+            df_xlsx = governor.put(excel_key, warmed['excel'], 'excel')
+        if df_xlsx is None and st.session_state.get('exportar') == spec:
+            df_xlsx = governor.put(excel_key, to_excel(expand_profiles(bank)), 'excel')
+            st.session_state.pop('exportar')  # Pedido atendido: os próximos envios não exportam
+        if df_xlsx is None:
+            st.button('📄 Preparar download em EXCEL', on_click=request_export, args=(spec,))
+        else:
+            st.download_button(
+                label='📥 Download tabela filtrada em EXCEL',
+                data=df_xlsx,
+                file_name='bank_filtered.xlsx'
             )
-            ax[1].set_title('Dados Filtrados')
-
-            st.pyplot(fig)
-        
-        elif graph_type == 'Pizza':
-            st.write("### Gráficos de Pizza")
-            fig, ax = plt.subplots(1, 2, figsize=(10, 5))
-
-            # Dados brutos
-            bank_raw_target_perc = bank_raw['y'].value_counts(normalize=True).mul(100)
-            ax[0].pie(
-                bank_raw_target_perc,
-                labels=bank_raw_target_perc.index,
-                autopct='%1.1f%%',
-                colors=['blue', 'orange']
-            )
-            ax[0].set_title('Dados Brutos')
+        st.markdown("---")
 
-            # Dados filtrados
-            bank_target_perc = bank['y'].value_counts(normalize=True).mul(100)
-            ax[1].pie(
-                bank_target_perc,
-                labels=bank_target_perc.index,
-                autopct='%1.1f%%',
-                colors=['blue', 'orange']
-            )
-            ax[1].set_title('Dados Filtrados')
+        # Gráficos (renderizados uma vez por filtro e tipo, guardados como PNG)
+        st.write(f"### Gráficos de {graph_type}")
+        chart_key = ('grafico', spec, graph_type)
+        png = governor.get(chart_key)
+        if png is None:
+            bank_perc = warmed['proporcao'] if warmed is not None else target_perc(bank)
+            fig = plot_target(target_perc(counts=state['alvo']), bank_perc, graph_type)
+            png = governor.put(chart_key, render_png(fig), 'gráfico')
+        st.image(png)
+        st.markdown("---")
 
-            st.pyplot(fig)
+        # Tendência por mês e dia da semana em ordem de calendário (guardada por filtro)
+        if st.checkbox('📅 Tendência por mês e dia da semana'):
+            trend = governor.get(('tendencia', spec))
+            if trend is None:
+                raw_trends, bank_trends = trend_rates(dataset_trends(state)), trend_rates(time_trends(bank))
+                table = pd.concat(
+                    [pd.concat([raw_trends[c], bank_trends[c]], axis=1, keys=['Brutos', 'Filtrados'])
+                     .loc[raw_trends[c]['volume'] > 0] for c in CALENDAR_ORDER],
+                    keys=['Mês', 'Dia da semana']
+                )
+                trend = governor.put(('tendencia', spec), {
+                    'grafico': render_png(plot_trends(raw_trends, bank_trends)),
+                    'tabela': table,
+                }, 'gráfico')
+            st.image(trend['grafico'])
+            st.dataframe(trend['tabela'])
+    else:
+        show_memory_diagnostics(diagnostics, governor, tier, warmer)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,65 @@
+# Identidade visual dos apps: as imagens da marca são resolvidas a partir da
+# pasta do repositório (independente do diretório de execução), redimensionadas
+# e codificadas uma única vez por processo. Os bytes já saem no formato que o
+# st.image serve sem reprocessar (PNG com transparência, JPEG nas demais).
+import os
+from collections import namedtuple
+from io import BytesIO
+
+import streamlit as st
+from PIL import Image
+
+# Pasta das imagens (padrão: raiz do repositório, onde estão os arquivos da marca)
+ASSET_DIR = os.environ.get('TELEMARKETING_ASSETS', os.path.dirname(os.path.abspath(__file__)))
+BRANDING_FILE = 'Bank-Branding.jpg'
+ICON_FILE = 'telmarketing_icon.png'
+
+# Largura (px) da imagem da barra lateral: 2x a largura útil, para telas de alta densidade
+BRANDING_WIDTH = int(os.environ.get('TELEMARKETING_BRANDING_WIDTH', 600))
+# Lado máximo (px) do ícone da aba do navegador
+ICON_SIZE = 64
+
+EncodedImage = namedtuple('EncodedImage', ['data', 'format', 'size'])
+Assets = namedtuple('Assets', ['branding', 'icon'])
+
+
+# Função para redimensionar uma imagem (sem ampliar) e codificá-la em bytes
+def encode_image(path, max_width, max_height=None, quality=85):
+    with Image.open(path) as image:
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGB')
+        image.thumbnail((max_width, max_height or image.height), Image.LANCZOS)
+        image_format = 'PNG' if image.mode in ('RGBA', 'LA') else 'JPEG'
+        output = BytesIO()
+        image.save(output, format=image_format, quality=quality, optimize=True)
+        return EncodedImage(output.getvalue(), image_format, image.size)
+
+
+# Função para preparar as imagens da marca, compartilhadas por todas as sessões do processo
+@st.cache_resource(show_spinner=False)
+def load_assets(asset_dir=ASSET_DIR):
+    encoded = {}
+    for name, filename, size in (('branding', BRANDING_FILE, (BRANDING_WIDTH, None)),
+                                 ('icon', ICON_FILE, (ICON_SIZE, ICON_SIZE))):
+        try:
+            encoded[name] = encode_image(os.path.join(asset_dir, filename), *size)
+        except FileNotFoundError:
+            encoded[name] = None
+    return Assets(**encoded)
+
+
+# Ícone da página para o st.set_page_config (None usa o padrão do Streamlit)
+def page_icon():
+    icon = load_assets().icon
+    return icon.data if icon is not None else None
+
+
+# Função para exibir a imagem da marca na barra lateral
+def sidebar_branding():
+    branding = load_assets().branding
+    if branding is None:
+        st.sidebar.warning("Imagem não encontrada!")
+        return
+    st.sidebar.image(branding.data, output_format=branding.format, use_container_width=True)
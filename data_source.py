@@ -0,0 +1,115 @@
+# Fonte de dados do servidor: carrega o CSV uma vez por processo, observa o
+# arquivo (mtime + hash do conteúdo) e recarrega em segundo plano, trocando a
+# versão em uso de forma atômica para todas as sessões. Uma mudança só é lida
+# depois que mtime e tamanho ficam estáveis entre duas verificações, para não
+# carregar um arquivo ainda em cópia.
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Versão carregada do arquivo; substituída inteira a cada recarga
+Snapshot = namedtuple('Snapshot', ['version', 'mtime', 'digest', 'data'])
+
+
+# Função para ler o arquivo uma única vez: os mesmos bytes são usados no hash e na leitura
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class DatasetSource:
+    def __init__(self, path, sep=';', interval=5.0):
+        self.path = path
+        self.sep = sep
+        self.interval = interval
+        self._pending = None  # (mtime, tamanho) visto na última verificação, à espera de estabilizar
+        self._failed = None   # (mtime, hash) do último conteúdo que não pôde ser lido; ignorado até mudar
+        self._snapshot = self._load(version=1)  # Primeira carga síncrona
+
+        # Thread de observação do arquivo (daemon: encerra junto com o servidor)
+        self._watcher = threading.Thread(target=self._watch, name=f'watch:{path}', daemon=True)
+        self._watcher.start()
+
+    # Versão e dados devem ser lidos do mesmo Snapshot: lidos separadamente,
+    # uma recarga entre as duas leituras misturaria versões
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def get(self):
+        return self._snapshot.data
+
+    def _load(self, version):
+        mtime = os.stat(self.path).st_mtime_ns
+        content = read_bytes(self.path)
+        return self._parse(version, mtime, content, hashlib.sha1(content).hexdigest())
+
+    def _parse(self, version, mtime, content, digest):
+        data = pd.read_csv(BytesIO(content), sep=self.sep)
+        return Snapshot(version, mtime, digest, data)
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                # Arquivo ausente ou em escrita: mantém a versão atual e tenta de novo
+                logger.exception("Falha ao verificar %s", self.path)
+
+    def check(self):
+        current = self._snapshot
+        stat = os.stat(self.path)
+        if stat.st_mtime_ns == current.mtime:
+            self._pending = None
+            return False
+        if self._failed is not None and stat.st_mtime_ns == self._failed[0]:
+            return False  # Mesmo arquivo que já falhou: espera uma nova mudança
+
+        # mtime mudou: espera mtime e tamanho se repetirem na próxima verificação
+        seen = (stat.st_mtime_ns, stat.st_size)
+        if seen != self._pending:
+            self._pending = seen
+            return False
+        self._pending = None
+
+        # Estável: só recarrega se o conteúdo também mudou (hash dos bytes que serão lidos)
+        content = read_bytes(self.path)
+        if len(content) != stat.st_size:
+            return False  # Mudou durante a leitura: confere de novo na próxima volta
+        digest = hashlib.sha1(content).hexdigest()
+        if digest == current.digest:
+            self._snapshot = current._replace(mtime=stat.st_mtime_ns)
+            return False
+        if self._failed is not None and digest == self._failed[1]:
+            self._failed = (stat.st_mtime_ns, digest)  # Mesmo conteúdo inválido regravado
+            return False
+        try:
+            snapshot = self._parse(current.version + 1, stat.st_mtime_ns, content, digest)
+        except Exception:
+            # Arquivo malformado: mantém a versão atual e registra a falha uma única vez
+            logger.exception("Falha ao ler %s; mantida a versão %d", self.path, current.version)
+            self._failed = (stat.st_mtime_ns, digest)
+            return False
+        self._failed = None
+        self._snapshot = snapshot
+        logger.info("Recarregado %s (versão %d)", self.path, self._snapshot.version)
+        return True
+
+
+# Fonte compartilhada por todas as sessões do processo
+@st.cache_resource(show_spinner=True)
+def get_source(path, sep=';'):
+    return DatasetSource(path, sep)
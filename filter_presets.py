@@ -0,0 +1,174 @@
+# Filtros salvos: combinações nomeadas de filtros persistidas em JSON e um
+# aquecedor em segundo plano que, a cada início do servidor ou recarga da base,
+# pré-calcula o resultado de cada filtro salvo (linhas, proporções de y e Excel)
+# para que o primeiro usuário do dia já o encontre pronto.
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import streamlit as st
+
+from memory_governor import estimate_nbytes
+
+logger = logging.getLogger(__name__)
+
+# Arquivo dos filtros salvos (padrão: raiz do repositório, independente do diretório de execução)
+# e limites de armazenamento (configuráveis por variável de ambiente)
+PRESETS_PATH = os.environ.get('TELEMARKETING_PRESETS',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'filter_presets.json'))
+MAX_PRESETS = int(os.environ.get('TELEMARKETING_MAX_PRESETS', 20))
+WARM_BUDGET_MB = float(os.environ.get('TELEMARKETING_PRESET_BUDGET_MB', 256))
+
+# Resultado pré-calculado de um filtro salvo para uma versão da base
+Warmed = namedtuple('Warmed', ['version', 'saved', 'value', 'nbytes'])
+
+
+class PresetStore:
+    def __init__(self, path=PRESETS_PATH, max_presets=MAX_PRESETS):
+        self.path = path
+        self.max_presets = max_presets
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._presets = {}
+
+    def load(self):
+        with self._lock:
+            return self._read()
+
+    def save(self, name, preset):
+        # Leitura, alteração e escrita sob o mesmo lock: salvamentos simultâneos não se perdem
+        with self._lock:
+            presets = self._read()
+            presets.pop(name, None)
+            presets[name] = {**preset, 'saved': time.time()}
+            # Armazenamento limitado: descarta os salvos há mais tempo
+            for old in sorted(presets, key=lambda n: presets[n]['saved'])[:-self.max_presets]:
+                del presets[old]
+            self._write(presets)
+
+    def delete(self, name):
+        with self._lock:
+            presets = self._read()
+            if presets.pop(name, None) is not None:
+                self._write(presets)
+
+    def _read(self):
+        # Relê o arquivo só quando ele muda (pode ser editado por outro processo); chamado com o lock
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime, self._presets = None, {}
+            return dict(self._presets)
+        if mtime != self._mtime:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._presets = json.load(f)
+            except (OSError, ValueError):
+                logger.exception("Falha ao ler %s", self.path)
+            self._mtime = mtime
+        return dict(self._presets)
+
+    def _write(self, presets):
+        # Escrita atômica: arquivo temporário + troca; chamado com o lock
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(presets, f, ensure_ascii=False, indent=2, default=lambda o: o.item())
+        os.replace(tmp, self.path)
+        self._mtime = None  # Força a releitura no próximo load
+
+
+class PresetWarmer:
+    def __init__(self, source, store, prepare, compute, budget_mb=WARM_BUDGET_MB, interval=5.0):
+        self.source = source      # DatasetSource: versão e dados da base do servidor
+        self.store = store
+        self.prepare = prepare    # dados -> contexto reutilizado por todos os filtros de uma versão
+        self.compute = compute    # (contexto, filtro salvo) -> resultado pré-calculado
+        self.budget = int(budget_mb * 2**20)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._results = OrderedDict()  # nome -> Warmed, do menos ao mais usado
+        self._evicted = set()          # (nome, salvo, versão) descartados pelo orçamento; não são refeitos
+        self._failed = set()           # (nome, salvo, versão) cujo cálculo falhou; não são refeitos
+        self._context = None           # (versão, contexto): preparado uma vez por versão da base
+        self._wake = threading.Event()
+
+        # Thread de aquecimento (daemon: encerra junto com o servidor)
+        self._thread = threading.Thread(target=self._run, name='preset-warmer', daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def lookup(self, name, saved, version):
+        with self._lock:
+            warmed = self._results.get(name)
+            if warmed is None or warmed.version != version or warmed.saved != saved:
+                return None
+            self._results.move_to_end(name)
+            return warmed.value
+
+    def usage(self):
+        with self._lock:
+            return len(self._results), sum(w.nbytes for w in self._results.values()), len(self._failed)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Falha ao pré-calcular os filtros salvos")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def refresh(self):
+        snapshot = self.source.snapshot()
+        version = snapshot.version
+        presets = self.store.load()
+        with self._lock:
+            # Invalidação: resultados de outra versão da base ou de filtros alterados/excluídos
+            for name, warmed in list(self._results.items()):
+                if (warmed.version != version or name not in presets
+                        or presets[name]['saved'] != warmed.saved):
+                    del self._results[name]
+            self._evicted = {key for key in self._evicted if key[2] == version}
+            self._failed = {key for key in self._failed if key[2] == version}
+            pending = [name for name in presets if name not in self._results
+                       and (name, presets[name]['saved'], version) not in self._evicted
+                       and (name, presets[name]['saved'], version) not in self._failed]
+        if not pending:
+            return
+
+        if self._context is None or self._context[0] != version:
+            self._context = None  # Libera o contexto da versão anterior antes de montar o novo
+            self._context = (version, self.prepare(snapshot.data))
+        context = self._context[1]
+        for name in pending:
+            try:
+                value = self.compute(context, presets[name])
+            except Exception:
+                # Falha de um filtro (ex.: Excel acima do limite de linhas) não interrompe os demais
+                logger.exception("Falha ao pré-calcular o filtro salvo %r", name)
+                with self._lock:
+                    self._failed.add((name, presets[name]['saved'], version))
+                continue
+            with self._lock:
+                if self.source.version != version:
+                    return  # Base recarregada durante o aquecimento: recomeça na próxima volta
+                self._results[name] = Warmed(version, presets[name]['saved'], value, estimate_nbytes(value))
+                self._enforce()
+        logger.info("Filtros salvos pré-calculados: %d (versão %d)", len(pending), version)
+
+    def _enforce(self):
+        # Orçamento do aquecedor: descarta os resultados usados há mais tempo
+        while len(self._results) > 1 and sum(w.nbytes for w in self._results.values()) > self.budget:
+            name, warmed = self._results.popitem(last=False)
+            self._evicted.add((name, warmed.saved, warmed.version))
+
+
+# Filtros salvos compartilhados por todas as sessões do processo
+@st.cache_resource
+def get_store(path=PRESETS_PATH):
+    return PresetStore(path)
@@ -0,0 +1,230 @@
+# Teste de carga local: simula várias sessões simultâneas de um app Streamlit
+# (via streamlit.testing, sem servidor nem serviços externos) aplicando filtros
+# e baixando o Excel sobre uma base sintética, e reporta vazão, latência dos
+# reruns (p50/p95/p99) e pico de memória (RSS) por nível de concorrência. Cada
+# nível roda num subprocesso novo, para que o RSS não acumule os anteriores.
+#
+# Uso: python load_test.py --app app_7.py --levels 1 10 50 --rows 41188
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from streamlit import config
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.testing.v1 import AppTest
+
+# Categorias da base bank-additional-full usadas na geração sintética
+CATEGORIES = {
+    'job': ['admin.', 'blue-collar', 'technician', 'services', 'management', 'retired',
+            'entrepreneur', 'self-employed', 'housemaid', 'unemployed', 'student', 'unknown'],
+    'marital': ['married', 'single', 'divorced', 'unknown'],
+    'education': ['basic.4y', 'basic.6y', 'basic.9y', 'high.school', 'illiterate',
+                  'professional.course', 'university.degree', 'unknown'],
+    'default': ['no', 'unknown', 'yes'],
+    'housing': ['no', 'yes', 'unknown'],
+    'loan': ['no', 'yes', 'unknown'],
+    'contact': ['cellular', 'telephone'],
+    'month': ['mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'],
+    'day_of_week': ['mon', 'tue', 'wed', 'thu', 'fri'],
+    'poutcome': ['nonexistent', 'failure', 'success'],
+}
+
+
+# Função para gerar uma base sintética com o esquema do bank marketing
+def make_synthetic_bank(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {'age': rng.integers(17, 99, rows)}
+    for column in ['job', 'marital', 'education', 'default', 'housing', 'loan',
+                   'contact', 'month', 'day_of_week']:
+        data[column] = rng.choice(CATEGORIES[column], rows)
+    data['duration'] = rng.integers(0, 4919, rows)
+    data['campaign'] = rng.integers(1, 57, rows)
+    data['pdays'] = np.where(rng.random(rows) < 0.96, 999, rng.integers(0, 27, rows))
+    data['previous'] = rng.integers(0, 8, rows)
+    data['poutcome'] = rng.choice(CATEGORIES['poutcome'], rows)
+    data['emp.var.rate'] = rng.choice([-3.4, -2.9, -1.8, -0.1, 1.1, 1.4], rows)
+    data['cons.price.idx'] = rng.choice([92.201, 92.893, 93.2, 93.994, 94.465], rows)
+    data['cons.conf.idx'] = rng.choice([-50.8, -46.2, -42.7, -41.8, -36.4], rows)
+    data['euribor3m'] = rng.uniform(0.634, 5.045, rows).round(3)
+    data['nr.employed'] = rng.choice([4963.6, 5099.1, 5191.0, 5228.1], rows)
+    rate = 0.08 + 0.1 * (data['contact'] == 'cellular') + 0.2 * (data['month'] == 'mar')
+    data['y'] = np.where(rng.random(rows) < rate, 'yes', 'no')
+    return pd.DataFrame(data)
+
+
+# O AppTest cria e descarta um Runtime global a cada execução, o que quebra
+# sessões simultâneas. Aqui todas compartilham um único Runtime simulado (com
+# caches e arquivos de mídia em memória), como as sessões de um servidor real.
+def install_shared_runtime():
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    config.set_option('global.appTest', True)
+
+
+# Função para ler o RSS atual do processo em bytes (psutil opcional, /proc no Linux)
+def current_rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class RssSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# Função para executar um rerun e medir sua latência
+def timed_run(at, latencies):
+    start = time.perf_counter()
+    at.run()
+    latencies.append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+
+# Cenário: aplicar uma combinação aleatória de filtros e enviar o formulário
+def apply_filters(at, rng, latencies):
+    jobs = at.multiselect(key='filtro_job')
+    jobs.set_value(rng.sample(CATEGORIES['job'], rng.randint(1, 4)))
+    at.multiselect(key='filtro_contact').set_value([rng.choice(CATEGORIES['contact'])])
+    at.multiselect(key='filtro_month').set_value(rng.sample(CATEGORIES['month'], rng.randint(1, 3)))
+    lo = rng.randint(17, 50)
+    at.slider(key='idades').set_value((lo, rng.randint(lo + 5, 98)))
+    at.button(key='FormSubmitter:my_form-Aplicar').click()
+    timed_run(at, latencies)
+
+
+# Cenário: filtros seguidos do clique de download (que também gera um rerun)
+def download(at, rng, latencies):
+    apply_filters(at, rng, latencies)
+    for button in at.button:
+        if 'download' in button.label.lower():
+            button.click()  # Etapa de preparo do Excel, quando existir
+            break
+    timed_run(at, latencies)
+
+
+SCENARIOS = {'filtros': [apply_filters], 'download': [download], 'misto': [apply_filters, download]}
+
+
+# Função para simular uma sessão completa (carga inicial + cenários)
+def run_session(app, scenario, reruns, seed, timeout):
+    rng = random.Random(seed)
+    latencies = []
+    at = AppTest.from_file(app, default_timeout=timeout)
+    timed_run(at, latencies)
+    for _ in range(reruns):
+        rng.choice(SCENARIOS[scenario])(at, rng, latencies)
+    return latencies
+
+
+# Função para rodar um nível de concorrência e resumir as métricas
+def run_level(app, sessions, scenario, reruns, timeout):
+    with RssSampler() as sampler, ThreadPoolExecutor(max_workers=sessions) as pool:
+        start = time.perf_counter()
+        futures = [pool.submit(run_session, app, scenario, reruns, seed, timeout) for seed in range(sessions)]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    latencies = np.concatenate(results) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'sessões': sessions,
+        'reruns': len(latencies),
+        'reruns/s': len(latencies) / elapsed,
+        'p50 (ms)': float(p50),
+        'p95 (ms)': float(p95),
+        'p99 (ms)': float(p99),
+        'pico RSS (MB)': sampler.peak / 2**20 if sampler.peak else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga local dos apps de telemarketing.')
+    parser.add_argument('--app', default='app_7.py')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 25, 50])
+    parser.add_argument('--rows', type=int, default=41188, help='linhas da base sintética')
+    parser.add_argument('--data', help='CSV (sep=;) a usar no lugar da base sintética')
+    parser.add_argument('--scenario', choices=SCENARIOS, default='misto')
+    parser.add_argument('--reruns', type=int, default=5, help='cenários por sessão')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--nivel', type=int, help=argparse.SUPPRESS)  # Uso interno: um nível no subprocesso
+    args = parser.parse_args()
+
+    app = os.path.abspath(args.app)
+
+    # Subprocesso: roda um único nível e devolve as métricas em JSON na última linha
+    if args.nivel is not None:
+        os.chdir(os.path.dirname(app))  # Caminhos relativos dos apps partem da pasta do app
+        install_shared_runtime()
+        print(json.dumps(run_level(app, args.nivel, args.scenario, args.reruns, args.timeout)), flush=True)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A base é servida pelo app via TELEMARKETING_DATA (o AppTest não faz upload), e os
+        # filtros salvos ficam na pasta temporária: o aquecedor não lê os filtros do repositório
+        data = args.data
+        if data is None:
+            data = os.path.join(tmp, 'bank-synthetic.csv')
+            make_synthetic_bank(args.rows).to_csv(data, sep=';', index=False)
+        env = {
+            **os.environ,
+            'TELEMARKETING_DATA': os.path.abspath(data),
+            'TELEMARKETING_PRESETS': os.path.join(tmp, 'filter_presets.json'),
+        }
+
+        report = []
+        for sessions in args.levels:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--app', app, '--scenario', args.scenario,
+                 '--reruns', str(args.reruns), '--timeout', str(args.timeout), '--nivel', str(sessions)],
+                env=env, stdout=subprocess.PIPE, text=True, check=True,
+            )
+            report.append(json.loads(result.stdout.strip().splitlines()[-1]))
+            print(f"{sessions} sessões concluídas", flush=True)
+
+    print(pd.DataFrame(report).to_string(index=False, float_format='{:.1f}'.format))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# Governador de memória: contabiliza os bytes aproximados mantidos por cada
+# sessão (bases carregadas e artefatos derivados, como tabelas filtradas,
+# arquivos Excel e gráficos renderizados) e aplica orçamentos por sessão e
+# global, descartando primeiro os artefatos usados há mais tempo (LRU).
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from matplotlib.figure import Figure
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Orçamentos configuráveis por variável de ambiente (em MB)
+SESSION_BUDGET_MB = float(os.environ.get('TELEMARKETING_SESSION_BUDGET_MB', 512))
+GLOBAL_BUDGET_MB = float(os.environ.get('TELEMARKETING_GLOBAL_BUDGET_MB', 4096))
+# Sessões sem atividade por mais tempo que isso (s) têm seus artefatos liberados
+SESSION_IDLE_TTL = float(os.environ.get('TELEMARKETING_SESSION_IDLE_TTL', 3600))
+
+Artifact = namedtuple('Artifact', ['value', 'nbytes', 'kind', 'last_used'])
+
+
+# Função para estimar os bytes ocupados por um objeto
+def estimate_nbytes(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum()) if isinstance(obj, pd.DataFrame) else int(usage)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+    if isinstance(obj, Figure):
+        width, height = obj.get_size_inches() * obj.dpi
+        return int(width * height * 4)  # Buffer RGBA da renderização
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(value) for value in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sum(estimate_nbytes(value) for value in obj)
+    return sys.getsizeof(obj)
+
+
+# Função para obter o identificador da sessão atual
+def current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+
+class MemoryGovernor:
+    def __init__(self, session_budget_mb=SESSION_BUDGET_MB, global_budget_mb=GLOBAL_BUDGET_MB,
+                 idle_ttl=SESSION_IDLE_TTL):
+        self.session_budget = int(session_budget_mb * 2**20)
+        self.global_budget = int(global_budget_mb * 2**20)
+        self.idle_ttl = idle_ttl
+        self._lock = threading.RLock()
+        self._datasets = {}    # sessão -> {nome: bytes}; contabilizados, nunca descartados
+        self._artifacts = {}   # sessão -> OrderedDict(chave -> Artifact), do mais antigo ao mais recente
+        self._last_seen = {}   # sessão -> último acesso
+        self._run_started = {}  # sessão -> início do rerun atual; artefatos usados nele não são descartados
+        self._evictions = 0
+
+    def track_dataset(self, name, nbytes, session_id=None):
+        session_id = session_id or current_session_id()
+        with self._lock:
+            self._datasets.setdefault(session_id, {})[name] = nbytes
+            self._touch(session_id)
+            self._enforce(session_id)
+
+    def resize_dataset(self, name, nbytes, session_id):
+        # Atualiza o tamanho de uma base sem contar como atividade da sessão (ex.: compressão)
+        with self._lock:
+            datasets = self._datasets.get(session_id)
+            if datasets is not None and name in datasets:
+                datasets[name] = nbytes
+
+    def begin_run(self, session_id=None):
+        session_id = session_id or current_session_id()
+        with self._lock:
+            self._run_started[session_id] = time.time()
+            self._touch(session_id)
+
+    def get(self, key, session_id=None):
+        session_id = session_id or current_session_id()
+        with self._lock:
+            self._touch(session_id)
+            artifacts = self._artifacts.get(session_id)
+            if artifacts is None or key not in artifacts:
+                return None
+            artifacts[key] = artifacts[key]._replace(last_used=time.time())
+            artifacts.move_to_end(key)
+            return artifacts[key].value
+
+    def put(self, key, value, kind, session_id=None):
+        session_id = session_id or current_session_id()
+        with self._lock:
+            self._touch(session_id)
+            artifacts = self._artifacts.setdefault(session_id, OrderedDict())
+            artifacts[key] = Artifact(value, estimate_nbytes(value), kind, time.time())
+            artifacts.move_to_end(key)
+            self._enforce(session_id, keep=key)
+        return value
+
+    def release(self, session_id):
+        with self._lock:
+            self._datasets.pop(session_id, None)
+            self._artifacts.pop(session_id, None)
+            self._last_seen.pop(session_id, None)
+            self._run_started.pop(session_id, None)
+
+    def usage(self):
+        with self._lock:
+            rows = []
+            for session_id in self._last_seen:
+                artifacts = self._artifacts.get(session_id, {})
+                datasets = sum(self._datasets.get(session_id, {}).values())
+                derived = sum(artifact.nbytes for artifact in artifacts.values())
+                rows.append({
+                    'sessão': session_id[:8],
+                    'bases (MB)': datasets / 2**20,
+                    'artefatos (MB)': derived / 2**20,
+                    'total (MB)': (datasets + derived) / 2**20,
+                    'bases acima do orçamento': datasets > self.session_budget,
+                    'artefatos': len(artifacts),
+                    'ocioso (s)': time.time() - self._last_seen[session_id],
+                })
+            return pd.DataFrame(rows), self._evictions
+
+    def _touch(self, session_id):
+        now = time.time()
+        self._last_seen[session_id] = now
+        for other, seen in list(self._last_seen.items()):
+            if now - seen > self.idle_ttl:
+                self.release(other)
+
+    def _session_total(self, session_id):
+        datasets = sum(self._datasets.get(session_id, {}).values())
+        artifacts = self._artifacts.get(session_id, {})
+        return datasets + sum(artifact.nbytes for artifact in artifacts.values())
+
+    def _oldest_evictable(self, session_id, keep=None, protect_run=False):
+        # Artefato menos usado da sessão, exceto o recém-inserido e, na sessão que está rodando,
+        # os usados no rerun atual (com a base acima do orçamento, descartá-los faria cada rerun
+        # recalcular tudo). Artefatos de reruns já encerrados de outras sessões seguem descartáveis
+        started = self._run_started.get(session_id, float('inf')) if protect_run else float('inf')
+        for key, artifact in self._artifacts.get(session_id, {}).items():
+            if key != keep and artifact.last_used < started:
+                return key, artifact
+        return None
+
+    def _enforce(self, session_id, keep=None):
+        # Orçamento da sessão: descarta os artefatos menos usados dela mesma
+        while self._session_total(session_id) > self.session_budget:
+            oldest = self._oldest_evictable(session_id, keep, protect_run=True)
+            if oldest is None:
+                break
+            del self._artifacts[session_id][oldest[0]]
+            self._evictions += 1
+
+        # Orçamento global: descarta o artefato usado há mais tempo entre todas as sessões
+        while sum(map(self._session_total, list(self._last_seen))) > self.global_budget:
+            candidates = {}
+            for other in self._last_seen:
+                if other == session_id:
+                    oldest = self._oldest_evictable(other, keep, protect_run=True)
+                else:
+                    oldest = self._oldest_evictable(other)
+                if oldest is not None:
+                    candidates[other] = oldest
+            if not candidates:
+                break
+            other = min(candidates, key=lambda s: candidates[s][1].last_used)
+            del self._artifacts[other][candidates[other][0]]
+            self._evictions += 1
+
+
+# Governador compartilhado por todas as sessões do processo
+@st.cache_resource
+def get_governor():
+    return MemoryGovernor()
@@ -0,0 +1,237 @@
+# Armazenamento em camadas das bases das sessões: bases sem uso há mais tempo
+# que o limite são comprimidas coluna a coluna em memória (zlib) e reidratadas
+# de forma transparente no próximo acesso. A razão de compressão e a latência
+# de reidratação ficam disponíveis para o painel de diagnóstico.
+import logging
+import os
+import pickle
+import threading
+import time
+import weakref
+import zlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from memory_governor import current_session_id, estimate_nbytes, get_governor
+
+logger = logging.getLogger(__name__)
+
+# Tempo sem uso (s) para comprimir uma base e nível do zlib (1 = mais rápido)
+COMPRESS_AFTER = float(os.environ.get('TELEMARKETING_COMPRESS_AFTER', 900))
+COMPRESSION_LEVEL = int(os.environ.get('TELEMARKETING_COMPRESSION_LEVEL', 1))
+
+# Formas comprimidas: array numérico, array de objetos, coluna categórica e tabela
+PackedArray = namedtuple('PackedArray', ['data', 'dtype', 'shape'])
+PackedObjects = namedtuple('PackedObjects', ['data'])
+PackedCategorical = namedtuple('PackedCategorical', ['codes', 'dtype'])
+PackedFrame = namedtuple('PackedFrame', ['columns', 'index'])
+
+
+# Função para comprimir um array (bytes crus nos numéricos, pickle nos de objetos)
+def pack_array(values, level):
+    if values.dtype.hasobject:
+        return PackedObjects(zlib.compress(pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL), level))
+    values = np.ascontiguousarray(values)
+    return PackedArray(zlib.compress(values.tobytes(), level), values.dtype, values.shape)
+
+
+# Função para comprimir uma coluna (categóricas guardam só os códigos e o dicionário)
+def pack_column(series, level):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return PackedCategorical(pack_array(series.cat.codes.to_numpy(), level), series.dtype)
+    return pack_array(series.to_numpy(), level)
+
+
+# Função para comprimir recursivamente tabelas e arrays em dicionários e tuplas. Listas e
+# demais objetos ficam como estão (ex.: a lista de fontes, que pode conter a base
+# compartilhada do servidor)
+def pack(obj, level=COMPRESSION_LEVEL):
+    if isinstance(obj, pd.DataFrame):
+        return PackedFrame([(column, pack_column(obj[column], level)) for column in obj.columns], obj.index)
+    if isinstance(obj, np.ndarray):
+        return pack_array(obj, level)
+    if isinstance(obj, dict):
+        return {key: pack(value, level) for key, value in obj.items()}
+    if type(obj) is tuple:
+        return tuple(pack(value, level) for value in obj)
+    return obj
+
+
+# Função inversa de pack
+def unpack(obj):
+    if isinstance(obj, PackedFrame):
+        return pd.DataFrame({column: unpack(packed) for column, packed in obj.columns}, index=obj.index)
+    if isinstance(obj, PackedCategorical):
+        return pd.Categorical.from_codes(unpack(obj.codes), dtype=obj.dtype)
+    if isinstance(obj, PackedArray):
+        return np.frombuffer(zlib.decompress(obj.data), dtype=obj.dtype).reshape(obj.shape).copy()
+    if isinstance(obj, PackedObjects):
+        return pickle.loads(zlib.decompress(obj.data))
+    if isinstance(obj, dict):
+        return {key: unpack(value) for key, value in obj.items()}
+    if type(obj) is tuple:
+        return tuple(unpack(value) for value in obj)
+    return obj
+
+
+# Função para estimar os bytes das partes comprimíveis de uma estrutura (tabelas e arrays)
+def packable_nbytes(obj):
+    if isinstance(obj, (pd.DataFrame, np.ndarray)):
+        return estimate_nbytes(obj)
+    if isinstance(obj, dict):
+        return sum(packable_nbytes(value) for value in obj.values())
+    if type(obj) is tuple:
+        return sum(packable_nbytes(value) for value in obj)
+    return 0
+
+
+# Função para estimar os bytes das mesmas partes depois de comprimidas
+def packed_nbytes(obj):
+    if isinstance(obj, (PackedArray, PackedObjects)):
+        return len(obj.data)
+    if isinstance(obj, PackedCategorical):
+        return packed_nbytes(obj.codes) + estimate_nbytes(obj.dtype.categories.to_numpy())
+    if isinstance(obj, PackedFrame):
+        return sum(packed_nbytes(packed) for _, packed in obj.columns) + estimate_nbytes(obj.index)
+    if isinstance(obj, dict):
+        return sum(packed_nbytes(value) for value in obj.values())
+    if type(obj) is tuple:
+        return sum(packed_nbytes(value) for value in obj)
+    return 0
+
+
+class TieredDataset:
+    def __init__(self, value, name, session_id):
+        self.name = name
+        self.session_id = session_id
+        self.raw_nbytes = packable_nbytes(value)
+        self.packed_nbytes = None
+        self.compress_ms = None
+        self.rehydrate_ms = None
+        self.last_used = time.time()
+        self._value = value
+        self._packed = None
+        self._lock = threading.Lock()
+
+    @property
+    def compressed(self):
+        return self._packed is not None
+
+    def get(self):
+        with self._lock:
+            self.last_used = time.time()
+            if self._packed is not None:
+                start = time.perf_counter()
+                self._value, self._packed = unpack(self._packed), None
+                self.rehydrate_ms = (time.perf_counter() - start) * 1000
+            return self._value
+
+    def compress(self, level=COMPRESSION_LEVEL):
+        with self._lock:
+            if self._packed is not None:
+                return False
+            start = time.perf_counter()
+            self.raw_nbytes = packable_nbytes(self._value)
+            self._packed, self._value = pack(self._value, level), None
+            self.packed_nbytes = packed_nbytes(self._packed)
+            self.compress_ms = (time.perf_counter() - start) * 1000
+            return True
+
+
+class DatasetTier:
+    def __init__(self, governor, compress_after=COMPRESS_AFTER, level=COMPRESSION_LEVEL):
+        self.governor = governor
+        self.compress_after = compress_after
+        self.level = level
+        self._datasets = weakref.WeakSet()  # Bases saem junto com o estado da sessão
+        self._lock = threading.Lock()
+
+        # Thread de compressão das bases ociosas (daemon: encerra junto com o servidor)
+        self._thread = threading.Thread(target=self._run, name='dataset-tier', daemon=True)
+        self._thread.start()
+
+    def register(self, value, name='base'):
+        dataset = TieredDataset(value, name, current_session_id())
+        with self._lock:
+            self._datasets.add(dataset)
+        return dataset
+
+    def sweep(self):
+        now = time.time()
+        with self._lock:
+            datasets = list(self._datasets)
+        for dataset in datasets:
+            if not dataset.compressed and now - dataset.last_used > self.compress_after:
+                if dataset.compress(self.level):
+                    self.governor.resize_dataset(dataset.name, dataset.packed_nbytes, dataset.session_id)
+
+    def stats(self):
+        with self._lock:
+            datasets = list(self._datasets)
+        return pd.DataFrame([{
+            'sessão': dataset.session_id[:8],
+            'estado': 'comprimida' if dataset.compressed else 'em uso',
+            'original (MB)': dataset.raw_nbytes / 2**20,
+            'comprimida (MB)': (dataset.packed_nbytes or float('nan')) / 2**20,
+            'razão': dataset.raw_nbytes / dataset.packed_nbytes if dataset.packed_nbytes else float('nan'),
+            'compressão (ms)': dataset.compress_ms,
+            'reidratação (ms)': dataset.rehydrate_ms,
+            'ociosa (s)': time.time() - dataset.last_used,
+        } for dataset in datasets])
+
+    def _run(self):
+        while True:
+            time.sleep(max(1.0, min(60.0, self.compress_after / 4)))
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Falha ao comprimir as bases ociosas")
+
+
+# Função para conferir a ida e volta de pack/unpack numa base mista (categórica com vazios,
+# texto, float com NaN e índice não sequencial) e nos índices ordenados de uma sessão
+def check_roundtrip(level=COMPRESSION_LEVEL):
+    frame = pd.DataFrame({
+        'job': pd.Categorical(['admin.', None, 'student', 'admin.', 'retired']),
+        'y': ['no', 'yes', None, 'no', 'yes'],
+        'euribor3m': [4.857, np.nan, 1.25, np.nan, 0.634],
+        'age': np.array([30, 41, 25, 57, 41]),
+        'contatado': [True, False, True, True, False],
+    }, index=pd.Index([10, 11, 13, 17, 19]))
+    ages = frame['age'].to_numpy()
+    order = np.argsort(ages, kind='stable')
+    rates = frame['euribor3m'].to_numpy()
+    rate_order = np.argsort(rates, kind='stable')
+    rate_order = rate_order[~np.isnan(rates[rate_order])]
+    state = {
+        'dados': frame,
+        'indices': {'age': (order, ages[order]), 'euribor3m': (rate_order, rates[rate_order])},
+        'idades': (25, 57),
+        'fontes': ['arquivo.csv'],
+    }
+
+    restored = unpack(pack(state, level))
+    pd.testing.assert_frame_equal(restored['dados'], frame)
+    for column, (order, values) in state['indices'].items():
+        restored_order, restored_values = restored['indices'][column]
+        assert type(restored['indices'][column]) is tuple
+        assert restored_order.dtype == order.dtype and restored_values.dtype == values.dtype
+        np.testing.assert_array_equal(restored_order, order)
+        np.testing.assert_array_equal(restored_values, values)
+    assert restored['idades'] == state['idades'] and restored['fontes'] == state['fontes']
+    return True
+
+
+# Camadas compartilhadas por todas as sessões do processo
+@st.cache_resource
+def get_tier():
+    return DatasetTier(get_governor())
+
+
+# Uso: python memory_tier.py (confere a ida e volta da compressão)
+if __name__ == '__main__':
+    check_roundtrip()
+    print('pack/unpack: ida e volta conferida')
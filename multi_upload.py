@@ -0,0 +1,95 @@
+# Upload de vários arquivos (um CSV por região ou mês): confere o esquema de
+# todos pelo cabeçalho, lê os arquivos em paralelo num pool de threads, unifica
+# os dicionários das colunas categóricas e marca cada linha com o arquivo de
+# origem (coluna usada também como filtro nos apps).
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+# Coluna gerada com o nome do arquivo de origem de cada linha
+SOURCE_COLUMN = 'arquivo'
+
+# Limite de threads de leitura (padrão: núcleos disponíveis)
+MAX_WORKERS = int(os.environ.get('TELEMARKETING_UPLOAD_WORKERS', os.cpu_count() or 4))
+
+# Limites do cache de uploads (entradas e tempo de vida em s), para que bases lidas não
+# fiquem inteiras na memória do processo por horas
+UPLOAD_CACHE_ENTRIES = int(os.environ.get('TELEMARKETING_UPLOAD_CACHE_ENTRIES', 4))
+UPLOAD_CACHE_TTL = float(os.environ.get('TELEMARKETING_UPLOAD_CACHE_TTL', 900))
+
+
+# Função para ler o cabeçalho de um arquivo enviado
+def read_header(file_data, sep=';'):
+    return pd.read_csv(BytesIO(file_data.getvalue()), sep=sep, nrows=0).columns.tolist()
+
+
+# Função para conferir se todos os arquivos têm as mesmas colunas do primeiro
+def check_schema(files, sep=';'):
+    headers = [read_header(f, sep) for f in files]
+    reference = headers[0]
+    problems = []
+    for f, header in zip(files[1:], headers[1:]):
+        missing = [c for c in reference if c not in header]
+        extra = [c for c in header if c not in reference]
+        if missing or extra:
+            problems.append(f"{f.name} (faltam: {', '.join(missing) or '-'}; sobram: {', '.join(extra) or '-'})")
+    if problems:
+        raise ValueError(f"Arquivos com colunas diferentes de {files[0].name}: " + ' | '.join(problems))
+    return reference
+
+
+# Função para ler um arquivo enviado (sem tocar na posição compartilhada do upload)
+def parse_upload(file_data, columns=None, sep=';'):
+    return pd.read_csv(BytesIO(file_data.getvalue()), sep=sep, usecols=columns)
+
+
+# Função para converter colunas de texto em categorias com o mesmo dicionário em todas as partes
+def unify_categories(frames, columns):
+    dtypes = {}
+    for column in columns:
+        if not all(column in frame.columns for frame in frames):
+            continue
+        # Categorias na ordem em que aparecem, arquivo a arquivo
+        values = pd.concat([pd.Series(frame[column].unique()) for frame in frames], ignore_index=True)
+        dtypes[column] = pd.CategoricalDtype(values.dropna().unique())
+    return [frame.astype(dtypes) for frame in frames]
+
+
+# Função para incluir linhas novas numa base já categorizada: as categorias novas entram no fim
+# do dicionário da base (os códigos existentes não mudam) e só o delta é recodificado
+def append_categories(base, delta, columns):
+    base, delta_dtypes = base.copy(deep=False), {}
+    for column in columns:
+        if column not in base.columns or not isinstance(base[column].dtype, pd.CategoricalDtype):
+            continue
+        new = pd.Index(delta[column].dropna().unique()).difference(base[column].cat.categories, sort=False)
+        if len(new):
+            base[column] = base[column].cat.add_categories(new)
+        delta_dtypes[column] = base[column].dtype
+    return base, delta.astype(delta_dtypes)
+
+
+# Função para ler vários arquivos em paralelo e juntá-los numa única base (sem cache: para
+# quem guarda a base no estado da sessão)
+def read_uploads(files, columns=None, categorical=(), sep=';'):
+    files = list(files)
+    reference = check_schema(files, sep)
+    usecols = None if columns is None else [c for c in reference if c in columns]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(files)))) as pool:
+        frames = list(pool.map(lambda f: parse_upload(f, usecols, sep), files))
+
+    # Mesma ordem de colunas do primeiro arquivo e coluna de origem no fim
+    frames = [frame[usecols or reference].assign(**{SOURCE_COLUMN: f.name})
+              for f, frame in zip(files, frames)]
+    frames = unify_categories(frames, [*categorical, SOURCE_COLUMN])
+    return pd.concat(frames, ignore_index=True)
+
+
+# Versão com cache limitado de read_uploads, para apps que releem a base a cada rerun
+@st.cache_data(show_spinner=True, max_entries=UPLOAD_CACHE_ENTRIES, ttl=UPLOAD_CACHE_TTL)
+def load_uploads(files, columns=None, categorical=(), sep=';'):
+    return read_uploads(files, columns, categorical, sep)